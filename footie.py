@@ -0,0 +1,141 @@
+"""
+Headless command line tools. Only pandas and numpy are imported, so these
+start quickly and run without Streamlit. Commands that need more import it
+when they run.
+
+Usage:
+    python footie.py ingest <dir> [-o season.csv] [-j workers] [--drives drives.csv] [--warehouse db] [--season name]
+    python footie.py expected-points <season.csv> [-o table.npy]
+    python footie.py export <season.csv> [-o report.xlsx] [--csv dir] [--explosive N]
+    python footie.py generate <out.csv> [--plays N] [--seed N]
+    python footie.py bench [--sizes N ...] [--save-baseline] [--tolerance F]
+"""
+import argparse
+import os
+import sys
+import time
+from modules import ingest
+from modules import synthetic
+
+
+def run_ingest(args):
+    output_path = args.output or os.path.join(args.directory, 'season.csv')
+    start = time.perf_counter()
+    season = ingest.ingest_directory(args.directory, output_path, args.workers, args.warehouse, args.season,
+                                     args.drives)
+    games = season['game_id'].nunique() if len(season) else 0
+    print(f"Ingested {games} games ({len(season)} plays) into {output_path} "
+          f"in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+def run_expected_points(args):
+    from modules import expected_points
+    from modules.play_schema import load_plays
+
+    start = time.perf_counter()
+    output = args.output or expected_points.EP_TABLE_PATH
+    plays = load_plays(args.season)
+    table = expected_points.fit_expected_points(plays)
+    expected_points.save_table(table, output)
+    scored = expected_points.score_plays(plays, table)
+    print(expected_points.compute_team_epa(plays, scored).to_string())
+    print(f"Fitted expected points from {len(plays)} plays into {output} "
+          f"in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+def run_export(args):
+    from modules import export
+    from modules.play_schema import load_plays
+
+    start = time.perf_counter()
+    plays = load_plays(args.season)
+    output = args.output or os.path.splitext(args.season)[0] + '_report.xlsx'
+    teams = export.export_workbook(plays, output, args.explosive)
+    print(f"Wrote {teams} team sheets to {output}")
+    if args.csv:
+        for path in export.export_csv(plays, args.csv, args.explosive):
+            print(f"Wrote {path}")
+    print(f"Exported in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+def run_generate(args):
+    synthetic.write_raw(args.output, args.plays, seed=args.seed)
+    print(f"Wrote at least {args.plays} raw rows to {args.output}")
+    return 0
+
+
+def run_bench(args):
+    from modules import benchmark
+
+    baseline_path = args.baseline or benchmark.BASELINE_PATH
+    results = benchmark.run_benchmarks(args.sizes or benchmark.DEFAULT_SIZES, trace_memory=not args.no_memory,
+                                       seed=args.seed)
+    if args.save_baseline:
+        benchmark.save_baseline(results, baseline_path)
+        print(f"Saved baseline to {baseline_path}")
+        return 0
+
+    baseline = benchmark.load_baseline(baseline_path)
+    if baseline is None:
+        print(f"No baseline at {baseline_path}; run with --save-baseline to create one")
+        return 0
+    tolerance = benchmark.DEFAULT_TOLERANCE if args.tolerance is None else args.tolerance
+    regressions = benchmark.compare(results, baseline, tolerance)
+    for result, message in regressions:
+        print("REGRESSION " + benchmark.format_result(result, message))
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='footie', description='Football play-by-play tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest_parser = subparsers.add_parser('ingest', help='Preprocess every raw game CSV in a directory')
+    ingest_parser.add_argument('directory', help='Directory holding the raw game CSV files')
+    ingest_parser.add_argument('-o', '--output', help='Season CSV to write (default: <directory>/season.csv)')
+    ingest_parser.add_argument('-j', '--workers', type=int, default=None,
+                               help='Number of worker processes (default: CPU count)')
+    ingest_parser.add_argument('--drives', help='Drives CSV to write (default: <output>_drives.csv)')
+    ingest_parser.add_argument('--warehouse', help='Also load the games into this SQLite warehouse')
+    ingest_parser.add_argument('--season', help='Season recorded for the games in the warehouse')
+    ingest_parser.set_defaults(func=run_ingest)
+
+    ep_parser = subparsers.add_parser('expected-points', help='Fit the expected points table from a season')
+    ep_parser.add_argument('season', help='Season CSV or Feather file from ingest')
+    ep_parser.add_argument('-o', '--output', help='Table file to write (default: the table the app loads)')
+    ep_parser.set_defaults(func=run_expected_points)
+
+    export_parser = subparsers.add_parser('export', help='Write a workbook with a sheet per team, and optionally CSVs')
+    export_parser.add_argument('season', help='Season CSV or Feather file from ingest')
+    export_parser.add_argument('-o', '--output', help='Workbook to write (default: <season>_report.xlsx)')
+    export_parser.add_argument('--csv', help='Also write one CSV per report section into this directory')
+    export_parser.add_argument('--explosive', type=int, default=15,
+                               help='Minimum yards for an explosive play (default: %(default)s)')
+    export_parser.set_defaults(func=run_export)
+
+    generate_parser = subparsers.add_parser('generate', help='Write synthetic raw play-by-play')
+    generate_parser.add_argument('output', help='CSV file to write')
+    generate_parser.add_argument('--plays', type=int, default=200, help='Minimum number of raw rows (default: one game)')
+    generate_parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    generate_parser.set_defaults(func=run_generate)
+
+    bench_parser = subparsers.add_parser('bench', help='Time each stage on synthetic data and compare to a baseline')
+    bench_parser.add_argument('--sizes', type=int, nargs='+',
+                              help='Raw rows per run (default: benchmark.DEFAULT_SIZES)')
+    bench_parser.add_argument('--baseline', help='Baseline JSON file (default: benchmark.BASELINE_PATH)')
+    bench_parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline')
+    bench_parser.add_argument('--tolerance', type=float,
+                              help='Allowed relative slowdown or memory growth (default: benchmark.DEFAULT_TOLERANCE)')
+    bench_parser.add_argument('--no-memory', action='store_true', help='Skip the peak memory runs')
+    bench_parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    bench_parser.set_defaults(func=run_bench)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
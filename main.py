@@ -1,14 +1,98 @@
 import streamlit as st
-from modules import data_preprocessing
-from modules import data_processing
-from modules.data_processing import load_data, filter_data, compute_team_stats, compute_explosive_play_stats, compute_down_stats
-import matplotlib.pyplot as plt
+from modules import game_cache
+from modules import dataset_registry
+from modules import charts
+from modules import expected_points
+from modules import export
+from modules.query_index import PlayIndex
+from modules.yard_histogram import YardHistogram
+from modules import instrumentation
+from modules.instrumentation import stage
+from modules.data_processing import load_data, filter_data, compute_stats_table, compute_team_stats, compute_explosive_play_stats, compute_explosive_sweep, compute_down_stats
 import pandas as pd
 import os
+import io
 from streamlit_lottie import st_lottie
 import json
 
+# The explosive play threshold shown first; the team and down views share its stats table
+DEFAULT_EXPLOSIVE_PLAY_YARDS = 15
+
+# The thresholds offered in the sweep view
+SWEEP_YARDS = (1, 99)
+DEFAULT_SWEEP_YARDS = (10, 40)
+
+# Each stage is cached on the upload's content hash plus its own widget
+# values, so a rerun only recomputes the stages whose inputs changed.
+# Arguments starting with an underscore are not hashed by Streamlit.
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_stats_table(key, _data, explosive_play_yards):
+    # All teams and downs in one grouped pass; the per-team views below are lookups into it
+    return compute_stats_table(_data, explosive_play_yards)
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def load_histogram(key, _data):
+    # Built once per dataset; every explosive threshold is a lookup into it
+    return YardHistogram(_data)
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def cached_filter_options(key, _data):
+    return {
+        'poss': list(_data['poss'].unique()),
+        'down': list(_data['down'].unique()),
+        'playtype': list(_data['playtype'].unique()),
+        'yards': (int(_data['yards'].min()), int(_data['yards'].max())),
+    }
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def load_index(key, _data):
+    # Built once per dataset; every filter change is answered from it
+    return PlayIndex(_data)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_filter(key, _data, selected_poss, selected_down, selected_playtype, selected_yards):
+    return filter_data(_data, list(selected_poss), selected_down, list(selected_playtype), selected_yards, load_index(key, _data))
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def load_aggregates(key, _data):
+    # Grouped once per dataset; every chart is drawn from these groups
+    return charts.aggregate_plays(_data)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_chart(key, _data, chart, selected_poss, selected_down, selected_playtype, selected_yards):
+    # PNG bytes, so showing the same chart again draws nothing
+    return charts.render_chart(chart, load_aggregates(key, _data), list(selected_poss), selected_down,
+                               list(selected_playtype), selected_yards)
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def load_expected_points(key, _data):
+    # The season table from 'footie.py expected-points' when there is one, else fitted on this upload
+    table = expected_points.load_table()
+    if table is None:
+        table = expected_points.fit_expected_points(_data)
+    return expected_points.score_plays(_data, table)
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def cached_workbook(key, _data, explosive_play_yards):
+    buffer = io.BytesIO()
+    export.export_workbook(_data, buffer, explosive_play_yards)
+    return buffer.getvalue()
+
+def show_stage_timings():
+    # Only shown when instrumentation is on (FOOTIE_INSTRUMENT=1); cached stages don't run and so don't appear
+    if not instrumentation.is_enabled():
+        return
+    with st.sidebar.expander("Stage timings"):
+        stages = pd.DataFrame(instrumentation.records())
+        if stages.empty:
+            st.text("No stages ran")
+            return
+        stages['stage'] = ['  ' * depth + name for depth, name in zip(stages['depth'], stages['stage'])]
+        st.dataframe(stages.set_index('stage')[['seconds', 'rows', 'memory_delta']])
+
 def main():
+    instrumentation.start_request()
     st.markdown("<h1 style='text-align: center;'>Football Statistics</h1>", unsafe_allow_html=True)
     st.text(" ")
 
@@ -20,78 +104,95 @@ def main():
 
         st.empty()  # This line will clear the previous elements (like the lottie animation) from the page
         
-        # Save the uploaded file to a temporary location
-        input_path = './data/' + uploaded_file.name
-        output_path = './data/preprocessed_' + uploaded_file.name
-        with open(input_path, 'wb') as f:
-            f.write(uploaded_file.getbuffer())
-        # Preprocess the uploaded file
-        data_preprocessing.preprocess_data(input_path, output_path)
-
-        # Load the data
-        data = pd.read_csv(output_path)
+        # Every session uploading the same file shares one read-only copy of its plays
+        with stage('upload.hash') as s:
+            raw_bytes = uploaded_file.getvalue()
+            key = game_cache.content_hash(raw_bytes)
+            s.rows = len(raw_bytes)
+        with stage('upload.load') as s:
+            data = dataset_registry.get_dataset(key, raw_bytes)
+            s.rows = len(data)
       
         # Display the team stats
         st.header("Team Statistics")
         selected_team = st.selectbox("Select a team", data['poss'].unique(), key='team_select_1')
-        team_stats = data_processing.compute_team_stats(data, selected_team)
+        team_stats = compute_team_stats(data, selected_team, cached_stats_table(key, data, DEFAULT_EXPLOSIVE_PLAY_YARDS))
         st.table(pd.DataFrame(team_stats, index=[selected_team]).T)
     
     
         # Get the explosive play yard threshold from the user
         st.header("Explosive Plays")
-        explosive_play_yards = st.number_input("Enter the minimum number of yards for a play to be considered explosive", min_value=1, value=15)
+        explosive_play_yards = st.number_input("Enter the minimum number of yards for a play to be considered explosive", min_value=1, value=DEFAULT_EXPLOSIVE_PLAY_YARDS)
     
         # Compute the explosive play stats, transpose the DataFrame, and display it
-        explosive_play_stats_df = data_processing.compute_explosive_play_stats(data, explosive_play_yards).transpose()
+        explosive_play_stats_df = compute_explosive_play_stats(data, explosive_play_yards, histogram=load_histogram(key, data)).transpose()
         st.dataframe(explosive_play_stats_df)
+
+        # Show how each team's explosive plays fall off as the threshold rises
+        st.header("Explosive Play Threshold Sweep")
+        sweep_yards = st.slider("Range of thresholds", *SWEEP_YARDS, DEFAULT_SWEEP_YARDS)
+        sweep_metric = st.selectbox("Metric", ['Total Explosive Plays', 'Total Yards from Ex', '% of Total Yards from Ex'])
+        sweep = compute_explosive_sweep(data, range(sweep_yards[0], sweep_yards[1] + 1), load_histogram(key, data))
+        st.line_chart(sweep[sweep_metric].unstack('Team'))
     
+        # Expected points added and success rate
+        st.header("Expected Points")
+        scored = load_expected_points(key, data)
+        st.dataframe(expected_points.compute_team_epa(data, scored))
+        selected_team3 = st.selectbox("Select a team", list(data['poss'].unique()), key='team_select_3')
+        st.dataframe(expected_points.compute_down_epa(data, selected_team3, scored))
+
         # Add a selector for the team
         st.header("Breakdown by Down")
         unique_teams = list(data['poss'].unique())
         selected_team2 = st.selectbox("Select a team", unique_teams, key='team_select_2')
     
         # Compute and display the down stats for the selected team
-        down_stats_df = data_processing.compute_down_stats(data, selected_team2).transpose()
+        down_stats_df = compute_down_stats(data, selected_team2, cached_stats_table(key, data, DEFAULT_EXPLOSIVE_PLAY_YARDS)).transpose()
         st.dataframe(down_stats_df)
       
         # Sidebar for filtering
         st.sidebar.header("Filter options")
     
         # Collect filter options
-        unique_poss = list(data['poss'].unique())
+        options = cached_filter_options(key, data)
+        unique_poss = options['poss']
         selected_poss = st.sidebar.multiselect('Select teams', unique_poss, unique_poss)
     
-        unique_down = list(data['down'].unique())
+        unique_down = options['down']
         selected_down = st.sidebar.selectbox('Select down', unique_down)
     
-        unique_playtype = list(data['playtype'].unique())
+        unique_playtype = options['playtype']
         selected_playtype = st.sidebar.multiselect('Select playtype', unique_playtype, unique_playtype)
     
-        min_yards, max_yards = int(data['yards'].min()), int(data['yards'].max())
+        min_yards, max_yards = options['yards']
         selected_yards = st.sidebar.slider('Select a range of yards', min_yards, max_yards, (min_yards, max_yards))
     
         # Filter the data based on user selections
-        filtered_data = data[
-            (data['poss'].isin(selected_poss)) &
-            (data['down'] == selected_down) &
-            (data['yards'] >= selected_yards[0]) & (data['yards'] <= selected_yards[1]) &
-            (data['playtype'].isin(selected_playtype))
-        ]
+        filtered_data = cached_filter(key, data, tuple(selected_poss), selected_down, tuple(selected_playtype), tuple(selected_yards))
     
         # Display filtered data
         st.header("Filtered Data")
         st.dataframe(filtered_data)
     
         # Generate the plot
+        selected_chart = st.sidebar.selectbox('Select chart', list(charts.CHARTS))
         if st.sidebar.button("Generate Plot"):
-            st.header("Total Yards Gained by Each Team")
-            plot_data = filtered_data.groupby(['poss', 'playtype'])['yards'].sum().sort_values()
-            plot_data.unstack().plot(kind='bar')
-            plt.xlabel('Team')
-            plt.ylabel('Total Yards')
-            plt.title('Total Yards Gained by Each Team')
-            st.pyplot(plt)
+            st.header(selected_chart)
+            st.image(cached_chart(key, data, selected_chart, tuple(selected_poss), selected_down,
+                                  tuple(selected_playtype), tuple(selected_yards)))
+
+        # Export every team's report in one workbook
+        st.sidebar.header("Export")
+        if st.sidebar.button("Prepare report workbook"):
+            st.sidebar.download_button("Download report", cached_workbook(key, data, explosive_play_yards),
+                                       file_name=f"{os.path.splitext(uploaded_file.name)[0]}_report.xlsx",
+                                       mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+    show_stage_timings()
+
+if instrumentation.is_enabled():
+    instrumentation.configure_logging()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,169 @@
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import pandas as pd
+from modules import synthetic
+from modules.data_preprocessing import preprocess_data
+from modules.data_processing import (filter_data, compute_stats_table, compute_team_stats,
+                                     compute_explosive_play_stats, compute_explosive_sweep, compute_down_stats)
+from modules.query_index import PlayIndex
+
+# Generated input sizes, in raw rows. One game is about 200 rows.
+DEFAULT_SIZES = [200, 10000, 100000]
+
+BASELINE_PATH = './data/benchmark_baseline.json'
+
+# A stage regresses when it is this much slower, or uses this much more
+# peak memory, than the baseline
+DEFAULT_TOLERANCE = 0.25
+
+# Differences below these are treated as noise
+MIN_SECONDS = 0.01
+MIN_BYTES = 1024 * 1024
+
+
+def measure(fn, trace_memory=True):
+    """
+    Runs fn and returns its result, wall time and peak traced memory.
+
+    The timed run and the memory run are separate, because tracing
+    allocations slows the code down.
+
+    Args:
+    fn: callable. Called with no arguments.
+    trace_memory: bool. Whether to make the extra run that traces memory.
+
+    Returns:
+    tuple of (result, seconds, peak bytes or None).
+    """
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result, seconds, peak
+
+
+def stage_functions(raw_path, preprocessed_path):
+    """
+    Returns the benchmarked stages in order. Each takes the result of the
+    'load' stage, except 'preprocess' and 'load' themselves.
+    """
+    def all_teams(data):
+        return [team for team in data['poss'].dropna().unique()]
+
+    def team_stats(data):
+        stats = compute_stats_table(data)
+        return [compute_team_stats(data, team, stats) for team in all_teams(data)]
+
+    def down_stats(data):
+        stats = compute_stats_table(data)
+        return [compute_down_stats(data, team, stats) for team in all_teams(data)]
+
+    def filtered(data):
+        index = PlayIndex(data)
+        teams = all_teams(data)
+        playtypes = list(data['playtype'].unique())
+        return [filter_data(data, teams, down, playtypes, (0, 20), index) for down in ['1st', '2nd', '3rd', '4th']]
+
+    return [
+        ('preprocess', lambda data: preprocess_data(raw_path, preprocessed_path)),
+        ('load', lambda data: pd.read_csv(preprocessed_path)),
+        ('stats_table', compute_stats_table),
+        ('team_stats', team_stats),
+        ('explosive_stats', compute_explosive_play_stats),
+        ('explosive_sweep', lambda data: compute_explosive_sweep(data, range(10, 41))),
+        ('down_stats', down_stats),
+        ('filter', filtered),
+    ]
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, trace_memory=True, seed=0, log=print):
+    """
+    Benchmarks every stage on generated inputs of each size.
+
+    Args:
+    sizes: list of int. Raw rows to generate for each run.
+    trace_memory: bool. Whether to record peak memory.
+    seed: int. The generator seed, so every run sees the same data.
+    log: callable. Receives a line of progress per stage, or None.
+
+    Returns:
+    list of dict with 'stage', 'size', 'rows', 'seconds' and 'peak_bytes'.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            raw_path = os.path.join(directory, f'raw_{size}.csv')
+            preprocessed_path = os.path.join(directory, f'preprocessed_{size}.csv')
+            synthetic.write_raw(raw_path, size, seed=seed)
+
+            data = None
+            for stage, fn in stage_functions(raw_path, preprocessed_path):
+                result, seconds, peak = measure(lambda: fn(data), trace_memory)
+                if stage == 'load':
+                    data = result
+                results.append({
+                    'stage': stage,
+                    'size': size,
+                    'rows': None if data is None else len(data),
+                    'seconds': seconds,
+                    'peak_bytes': peak,
+                })
+                if log is not None:
+                    log(format_result(results[-1]))
+    return results
+
+
+def format_result(result, note=''):
+    peak = '-' if result['peak_bytes'] is None else f"{result['peak_bytes'] / 1e6:.1f} MB"
+    return f"{result['stage']:<16} {result['size']:>9} {result['seconds']:>9.3f}s {peak:>10} {note}".rstrip()
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Finds the stages that got slower or used more memory than the baseline.
+
+    Args:
+    results: list of dict. From run_benchmarks.
+    baseline: list of dict. An earlier run_benchmarks result.
+    tolerance: float. The allowed relative increase.
+
+    Returns:
+    list of (result, message) for each regression.
+    """
+    previous = {(b['stage'], b['size']): b for b in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result['stage'], result['size']))
+        if before is None:
+            continue
+        if (result['seconds'] > before['seconds'] * (1 + tolerance)
+                and result['seconds'] - before['seconds'] > MIN_SECONDS):
+            regressions.append((result, f"time {before['seconds']:.3f}s -> {result['seconds']:.3f}s"))
+        if (result['peak_bytes'] is not None and before.get('peak_bytes') is not None
+                and result['peak_bytes'] > before['peak_bytes'] * (1 + tolerance)
+                and result['peak_bytes'] - before['peak_bytes'] > MIN_BYTES):
+            regressions.append((result, f"memory {before['peak_bytes'] / 1e6:.1f} MB -> {result['peak_bytes'] / 1e6:.1f} MB"))
+    return regressions
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
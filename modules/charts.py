@@ -0,0 +1,143 @@
+import io
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from modules.drives import field_position
+from modules.instrumentation import stage
+
+# Field position buckets for the heatmap, in yards from the offense's own goal line
+ZONE_EDGES = list(range(0, 101, 10))
+ZONE_LABELS = [f'{start}-{start + 10}' for start in ZONE_EDGES[:-1]]
+
+DOWNS = ['1st', '2nd', '3rd', '4th']
+
+# Columns the plays are grouped by; each sidebar filter selects on one of them
+GROUP_COLUMNS = ['poss', 'down', 'playtype', 'yards', 'zone']
+
+
+def aggregate_plays(data):
+    """
+    Groups the plays by every column a chart or sidebar filter uses.
+
+    Each group holds the plays sharing a team, down, play type, yards
+    gained and field position zone, so any filter selection is a few
+    hundred group rows rather than every play, and every chart is drawn
+    from the groups it selects.
+
+    Args:
+    data: DataFrame. The preprocessed plays. Not modified.
+
+    Returns:
+    DataFrame with GROUP_COLUMNS, 'plays' and 'total_yards'.
+    """
+    zone = pd.cut(field_position(data), ZONE_EDGES, labels=ZONE_LABELS, include_lowest=True)
+    keys = [data['poss'].rename('poss'), data['down'].rename('down'), data['playtype'].rename('playtype'),
+            data['yards'].rename('yards'), zone.rename('zone')]
+    groups = data['yards'].groupby(keys, sort=False, dropna=False, observed=True)
+    return pd.DataFrame({'plays': groups.size(), 'total_yards': groups.sum()}).reset_index()
+
+
+def select(aggregates, selected_teams, selected_downs, selected_playtypes, selected_yards_range):
+    """
+    Returns the groups matching the sidebar selections, as filter_data
+    does for plays. A selected_downs of None keeps every down.
+    """
+    low, high = selected_yards_range
+    keep = (aggregates['poss'].isin(selected_teams)
+            & aggregates['playtype'].isin(selected_playtypes)
+            & (aggregates['yards'] >= low) & (aggregates['yards'] <= high))
+    if selected_downs is not None:
+        keep &= aggregates['down'] == selected_downs
+    return aggregates[keep.fillna(False).astype(bool)]
+
+
+def draw_bars(ax, table):
+    """
+    Draws a grouped bar chart with one group per row and one bar per column.
+    """
+    width = 0.8 / max(len(table.columns), 1)
+    positions = np.arange(len(table.index))
+    for i, column in enumerate(table.columns):
+        ax.bar(positions + i * width - 0.4 + width / 2, table[column].to_numpy(), width, label=str(column))
+    ax.set_xticks(positions)
+    ax.set_xticklabels([str(label) for label in table.index], rotation=90)
+    if len(table.columns):
+        ax.legend(title=table.columns.name)
+
+
+def yards_by_team(fig, groups):
+    table = groups.groupby(['poss', 'playtype'], observed=True)['total_yards'].sum().unstack()
+    ax = fig.subplots()
+    draw_bars(ax, table)
+    ax.set_xlabel('Team')
+    ax.set_ylabel('Total Yards')
+    ax.set_title('Total Yards Gained by Each Team')
+
+
+def yards_by_down(fig, groups):
+    table = groups.groupby(['down', 'poss'], observed=True)[['total_yards', 'plays']].sum()
+    table = (table['total_yards'] / table['plays']).unstack().reindex(DOWNS)
+    ax = fig.subplots()
+    draw_bars(ax, table)
+    ax.set_xlabel('Down')
+    ax.set_ylabel('Yards per Play')
+    ax.set_title('Yards per Play by Down')
+
+
+def field_position_heatmap(fig, groups):
+    table = groups.groupby(['poss', 'zone'], observed=True)[['total_yards', 'plays']].sum()
+    table = (table['total_yards'] / table['plays']).unstack().reindex(columns=ZONE_LABELS)
+    ax = fig.subplots()
+    image = ax.imshow(table.to_numpy(dtype=float, na_value=np.nan), aspect='auto', cmap='viridis')
+    ax.set_xticks(range(len(table.columns)))
+    ax.set_xticklabels(table.columns, rotation=45)
+    ax.set_yticks(range(len(table.index)))
+    ax.set_yticklabels([str(team) for team in table.index])
+    ax.set_xlabel('Yards from Own Goal Line')
+    ax.set_title('Yards per Play by Field Position')
+    fig.colorbar(image, ax=ax, label='Yards per Play')
+
+
+# Chart name to (draw function, whether the down filter applies)
+CHARTS = {
+    'Total Yards by Team': (yards_by_team, True),
+    'Yards per Play by Down': (yards_by_down, False),
+    'Field Position Heatmap': (field_position_heatmap, True),
+}
+
+
+def render_chart(name, aggregates, selected_teams, selected_downs, selected_playtypes, selected_yards_range):
+    """
+    Draws one of CHARTS for a filter selection and returns it as a PNG.
+
+    Each chart gets its own Figure, never registered with pyplot, so
+    concurrent sessions do not share drawing state, and the figure is
+    cleared as soon as the image is written.
+
+    Args:
+    name: str. A key of CHARTS.
+    aggregates: DataFrame. From aggregate_plays.
+    selected_teams, selected_downs, selected_playtypes,
+    selected_yards_range: the sidebar selections, as for filter_data.
+
+    Returns:
+    bytes.
+    """
+    draw, uses_down = CHARTS[name]
+    groups = select(aggregates, selected_teams, selected_downs if uses_down else None,
+                    selected_playtypes, selected_yards_range)
+    with stage('render.chart', len(groups)):
+        fig = Figure(figsize=(8, 5))
+        FigureCanvasAgg(fig)
+        try:
+            if groups.empty:
+                fig.text(0.5, 0.5, 'No plays match the selected filters', ha='center', va='center')
+            else:
+                draw(fig, groups)
+                fig.tight_layout()
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format='png')
+        finally:
+            fig.clear()
+    return buffer.getvalue()
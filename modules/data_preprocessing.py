@@ -1,208 +1,312 @@
 import pandas as pd
 import numpy as np
-import re
-import sqlite3
+from modules.play_classifier import play_classifier, extract_yards, field_goal_made
+from modules.instrumentation import stage
 
-def preprocess_data(input_path, output_path):
+# Marker text in column 'one' and the value it switches on. When a row
+# contains several markers the first entry in the list wins, matching the
+# order of the original if/elif chains.
+HALF_MARKERS = [('Start of 1st Half', 1),
+                ('Start of 2nd Half', 2)]
+
+QUARTER_MARKERS = [('Start of 1st Half', 1),
+                   ('Start of Quarter #2', 2),
+                   ('Start of 2nd Half', 3),
+                   ('Start of Quarter #4', 4)]
+
+# Columns of a preprocessed file, in order
+OUTPUT_COLUMNS = ['half', 'quarter', 'poss', 'down', 'to_go', 'playtype', 'yards', 'outcome', 'ball_half', 'yardline', 'drive', 'one', 'two']
+
+# Columns preprocess_frame adds after OUTPUT_COLUMNS for the drive, expected
+# points and chart models. Preprocessed files keep the original layout, and
+# derive_columns rebuilds these from the play text.
+DERIVED_COLUMNS = ['field_position', 'special', 'field_goal_made']
+
+# The number of raw rows read at a time when streaming a file
+CHUNK_SIZE = 100000
+
+
+def carry_markers(one, markers, initial):
     """
-    Preprocesses a football data file.
+    Tags every row with the value of the most recent marker above it.
 
     Args:
-    input_path: str. The path to the input file.
-    output_path: str. The path to the output file.
+    one: Series. The raw 'one' column.
+    markers: list of (text, value). Marker text to look for and its value.
+    initial: int. The value used before the first marker is seen.
 
     Returns:
-    None.
+    Series of int.
     """
-    df = pd.read_csv(input_path)
+    conditions = [one.str.contains(text, regex=False, na=False) for text, _ in markers]
+    values = [value for _, value in markers]
+    marked = pd.Series(np.select(conditions, values, default=np.nan), index=one.index)
+    return marked.ffill().fillna(initial).astype(int)
 
-    conn = sqlite3.connect(':memory:')
-    c = conn.cursor()
-    df.to_sql('my_table', conn, index=False)
-    df.dropna(how='all', inplace=True)
-    
-    # Add here all the preprocessing steps you've described
-    df.dropna(how='all', inplace=True)
 
-    df.columns = ['one', 'two']
-    
-    # Add a new column called 'half'
-    df['half'] = ''
-    current_half = 1
-    
-    # Loop through the rows
-    for i, row in df.iterrows():
-        # If the cell in column 1 contains "Start of 1st Half"
-        if "Start of 1st Half" in row['one']:
-            current_half = 1
-        # If the cell in column 1 contains "Start of 2nd Half"
-        elif "Start of 2nd Half" in row['one']:
-            current_half = 2
-
-        # Set the 'half' column for this row and all following rows to the current half value
-        df.loc[i:, 'half'] = current_half
+def compute_ball_half(one, team_abbr):
+    """
+    Determines which half of the field the ball is on for each row.
 
-  
-    # Add a new column called 'quarter'
-    df['quarter'] = ''
-    current_quarter = 1
-    
-    # Loop through the rows
-    for i, row in df.iterrows():
-        # Check the value in column 'one' to determine the quarter
-        if "Start of 1st Half" in row['one']:
-            current_quarter = 1
-        elif "Start of Quarter #2" in row['one']:
-            current_quarter = 2
-        elif "Start of 2nd Half" in row['one']:
-            current_quarter = 3
-        elif "Start of Quarter #4" in row['one']:
-            current_quarter = 4
-        
-        # Set the 'quarter' column for this row and all following rows to the current quarter value
-        df.loc[i:, 'quarter'] = current_quarter
-    
-    def fill_poss(row):
-        match = re.search(r'(.*?) at \d{2}:\d{2}', row['one'])
-        if match:
-            return match.group(1)
-        else:
-            return np.nan # return NaN if the pattern is not found
-    
-    # Apply the function to each row
-    df['poss'] = df.apply(fill_poss, axis=1)
-    
-    # Forward-fill the NaN values
-    df['poss'].fillna(method='ffill', inplace=True)
-    
-    def fill_down(row):
-        match = re.search(r'^(1st|2nd|3rd|4th)', row['one'])
-        if match:
-            return match.group(1)
-        else:
-            return np.nan # return NaN if the pattern is not found
-    
-    df['down'] = df.apply(fill_down, axis=1)
-    
-    def fill_to_go(row):
-        match = re.search(r'and (.*?) at', row['one'])
-        if match:
-            return match.group(1)
-        else:
-            return np.nan # return NaN if the pattern is not found
-    
-    df['to_go'] = df.apply(fill_to_go, axis=1)
+    A row is 'own' when the possessing team's abbreviation appears in the
+    'one' column, otherwise 'opponents'. Rows are grouped by abbreviation
+    so each group is a single vectorized substring test.
+
+    Args:
+    one: Series. The raw 'one' column.
+    team_abbr: Series. The possessing team's abbreviation per row.
+
+    Returns:
+    ndarray of str.
+    """
+    one_lower = one.str.lower().to_numpy()
+    abbr_lower = team_abbr.str.lower()
+    own = np.zeros(len(one), dtype=bool)
+    for abbr, positions in abbr_lower.groupby(abbr_lower, sort=False).indices.items():
+        own[positions] = pd.Series(one_lower[positions]).str.contains(abbr, regex=False, na=False).to_numpy()
+    return np.where(own, 'own', 'opponents')
 
-    
-    # Extract the team abbreviation
-    df['team_abbr'] = df['poss'].apply(lambda x: re.search(r'[A-Z]+', x).group(0) if pd.notnull(x) else x)
-
-    # Determine the half
-    df['ball_half'] = df.apply(lambda row: 'own' if pd.notnull(row['team_abbr']) and row['team_abbr'].lower() in row['one'].lower() else 'opponents', axis=1)
-
-    # Extract the yardline
-    def extract_yardline(x):
-        if pd.notnull(x):
-            match = re.search(r'(\d+)$', x)  # find a number at the end of the string
-            if match:
-                return int(match.group(0))
-        return np.nan  # return NaN if pattern is not found or x is None
-    
-    df['yardline'] = df['one'].apply(extract_yardline)
+
+def compute_field_position(one, poss):
+    """
+    Returns each row's distance from the possessing team's own goal line.
+
+    Spots look like "1st and 10 at AVEMARIA35": the letters name the half
+    of the field and are the team name in capitals without spaces, so a
+    spot in the possessing team's half is its yardline and any other spot
+    is 100 minus it. Unlike 'ball_half', this does not depend on the
+    team's initials.
+
+    Args:
+    one: Series. The raw 'one' column.
+    poss: Series. The team in possession per row.
+
+    Returns:
+    Series of float, NaN where the row has no spot.
+    """
+    spot = one.str.extract(r'\bat ([A-Z]*)(\d+)$')
+    yardline = pd.to_numeric(spot[1])
+    team = poss.astype(object).str.upper().str.replace(r'[^A-Z]', '', regex=True)
+    own = (spot[0] == team) | (spot[0] == '')
+    return yardline.where(own, 100 - yardline)
+
+
+def parse_structure(df, half=1, quarter=1, poss=np.nan, drive=0):
+    """
+    Adds the game-state columns derived from the raw 'one' column.
+
+    Computes 'half', 'quarter', 'poss', 'down', 'to_go', 'ball_half',
+    'yardline', 'field_position' and 'drive' in a single vectorized pass
+    over the frame.
+    The keyword arguments carry the game state in from an earlier chunk of
+    the same file; the defaults are the state at kickoff.
+
+    Args:
+    df: DataFrame. Raw play-by-play with columns 'one' and 'two'.
+    half: int. The half in effect before the first row.
+    quarter: int. The quarter in effect before the first row.
+    poss: str. The team in possession before the first row.
+    drive: int. The drive number before the first row.
+
+    Returns:
+    DataFrame. A copy of df with the new columns added.
+    """
+    df = df.copy()
+    one = df['one']
+
+    rows = len(df)
+
+    with stage('preprocess.half_quarter', rows):
+        df['half'] = carry_markers(one, HALF_MARKERS, half)
+        df['quarter'] = carry_markers(one, QUARTER_MARKERS, quarter)
+
+    # Possession lines look like "Ave Maria at 15:00"; carry them forward
+    with stage('preprocess.poss', rows):
+        df['poss'] = one.str.extract(r'(.*?) at \d{2}:\d{2}', expand=False).ffill()
+        if pd.notna(poss):
+            df['poss'] = df['poss'].fillna(poss)
+
+    with stage('preprocess.down_to_go', rows):
+        df['down'] = one.str.extract(r'^(1st|2nd|3rd|4th)', expand=False)
+        df['to_go'] = one.str.extract(r'and (.*?) at', expand=False)
+
+    with stage('preprocess.ball_half', rows):
+        # poss is all NaN (and so float) until the first possession line
+        team_abbr = df['poss'].astype(object).str.extract(r'([A-Z]+)', expand=False)
+        df['ball_half'] = compute_ball_half(one, team_abbr)
+
+    # The yardline is the number at the end of the string
+    with stage('preprocess.yardline', rows):
+        df['yardline'] = pd.to_numeric(one.str.extract(r'(\d+)$', expand=False))
+
+    with stage('preprocess.field_position', rows):
+        df['field_position'] = compute_field_position(one, df['poss'])
 
     # Add drive cumulative sums - ignorning empty possessions
-    df['drive'] = ((df['poss'] != df['poss'].shift()) & df['poss'].notna()).cumsum()
+    with stage('preprocess.drive', rows):
+        df['drive'] = ((df['poss'] != df['poss'].shift(fill_value=poss)) & df['poss'].notna()).cumsum() + drive
+
+    return df
+
+
+def derive_columns(plays):
+    """
+    Computes DERIVED_COLUMNS for plays read from a file without them.
+
+    Args:
+    plays: DataFrame. Preprocessed plays with 'poss', 'playtype', 'one'
+    and 'two'.
+
+    Returns:
+    DataFrame indexed like plays.
+    """
+    one, two = plays['one'].astype(object), plays['two'].astype(object)
+    return pd.DataFrame({
+        'field_position': compute_field_position(one, plays['poss']),
+        'special': play_classifier.classify(two)['special'],
+        'field_goal_made': field_goal_made(plays['playtype'].astype(object), two),
+    }, index=plays.index)
+
+
+def derived_column(plays, column):
+    """
+    Returns one of DERIVED_COLUMNS of preprocessed plays, computing it from
+    the play text when the frame does not have it.
+    """
+    if column in plays.columns:
+        return plays[column]
+    return derive_columns(plays)[column]
+
+
+def new_game_state():
+    """
+    Returns the game state at the start of a file, as passed between
+    chunks by preprocess_frame.
+    """
+    return {'half': 1, 'quarter': 1, 'poss': np.nan, 'drive': 0}
+
+
+def preprocess_frame(df, state=None):
+    """
+    Preprocesses raw play-by-play that has already been read into memory.
+
+    Args:
+    df: DataFrame. The raw two-column file as read by pd.read_csv, or one
+    chunk of it.
+    state: dict. The game state left by the previous chunk, from
+    new_game_state. It is updated in place with the state at the end of
+    this chunk. Omit it to preprocess a whole file.
+
+    Returns:
+    DataFrame. The preprocessed plays.
+    """
+    if state is None:
+        state = new_game_state()
+
+    df = df.dropna(how='all').astype(object)
+
+    df.columns = ['one', 'two']
+    if df.empty:
+        return pd.DataFrame(columns=OUTPUT_COLUMNS + DERIVED_COLUMNS)
+    
+    with stage('preprocess.parse_structure', len(df)):
+        df = parse_structure(df, **state)
 
+    # Remember where this chunk left off before any rows are dropped
+    last = df.iloc[-1]
+    state.update(half=last['half'], quarter=last['quarter'], poss=last['poss'], drive=last['drive'])
   
-    def fill_playtype(row):
-        # Define the list of words to search for and their corresponding play types
-        words = [('Pass', 'Pass'), 
-                 ('Rush', 'Rush'), 
-                 ('Sacked', 'Pass'), 
-                 ('Sack', 'Pass'), 
-                 ('Field Goal', 'Field Goal'), 
-                 ('Punt', 'Punt'), 
-                 ('Kick Attempt', 'Kick Attempt'),
-                 ('Penalty', 'Penalty'),
-                 ('Kickoff', 'Kickoff')]
+    # Classify every play description in one pass over column 'two'
+    with stage('preprocess.classify', len(df)):
+        labels = play_classifier.classify(df['two'])
+        df['playtype'] = labels['playtype']
+        df['outcome'] = labels['outcome']
+        df['special'] = labels['special']
+        df['field_goal_made'] = field_goal_made(df['playtype'], df['two'])
+
+    with stage('preprocess.yards', len(df)):
+        df['yards'] = extract_yards(df['two'])
     
-        # Check if the value in the 'two' column is a string
-        if isinstance(row['two'], str):
-            # Iterate over the words
-            for word, playtype in words:
-                if re.search(word, row['two'], re.IGNORECASE):
-                    return playtype
+    with stage('preprocess.drop_rows') as s:
+        # Remove rows with NaN values in column 'two'
+        df.dropna(subset=['two'], inplace=True)
         
-        return np.nan # return NaN if no match is found or the value is not a string
-    
-    # Apply the function to each row
-    df['playtype'] = df.apply(fill_playtype, axis=1)
-    
-    def fill_yards(row):
-        # Check if the value in the 'two' column is a string
-        if isinstance(row['two'], str):
-            # Match the word 'for' followed by a space, then either 'no gain', 'loss of' followed by a number and 'yard(s)', or just a number and 'yard(s)'
-            match = re.search(r'for (no gain|loss of (\d+) yard(s)?|(\d+) yard(s)?)', row['two'], re.IGNORECASE)
-            if match:
-                if match.group(1) == 'no gain':
-                    return 0
-                elif 'loss of' in match.group(1):
-                    return -int(match.group(2))
-                else:
-                    return int(match.group(4))
+        # Remove rows where column 'one' contains the word "total"
+        df = df[~df['one'].str.contains(r'(?i)\btotal\b', na=False)]
         
-        return np.nan # return NaN if no match is found or the value is not a string
-    
-    # Apply the function to each row
-    df['yards'] = df.apply(fill_yards, axis=1)
-    
-    def fill_outcome(row):
-        # Define the list of words to search for and their corresponding outcomes
-        words = [('Touchdown', 'Touchdown'), 
-                 ('Penalty', 'Penalty'),
-                 ('Interception', 'Interception'),
-                 ('Intercepted', 'Interception'),
-                 ('Fumble', 'Fumble'),
-                 ('Fumbled', 'Fumble'),
-                 ('1st Down', '1st Down'),
-                 ('Kick Attempt Good', 'Kick Attempt Good'),
-                 ('Kick Attempt Failed', 'Kick Attempt Failed'),
-                 ('Touchback', 'Touchback'),
-                 ('Sack', 'Sack'),
-                 ('Sacked', 'Sack'),
-                 ('Blocked', 'Blocked'),
-                 ('No Play', 'No Play'),
-                 ('Incomplete', 'Incomplete')]
-    
-        # Check if the value in the 'two' column is a string
-        if isinstance(row['two'], str):
-            # Initialize the last match found to NaN
-            last_match = np.nan
-            # Iterate over the words
-            for word, outcome in words:
-                if re.search(word, row['two'], re.IGNORECASE):
-                    last_match = outcome
-            return last_match
+        # Drop rows with "drive start" in column 'two'
+        df = df[~df['two'].str.contains('drive start', case=False)]
         
-        return np.nan # return NaN if no match is found or the value is not a string
-    
-    # Apply the function to each row
-    df['outcome'] = df.apply(fill_outcome, axis=1)
-    
-    # Remove rows with NaN values in column 'two'
-    df.dropna(subset=['two'], inplace=True)
-    
-    # Remove rows where column 'one' contains the word "total"
-    df = df[~df['one'].str.contains(r'(?i)\btotal\b')]
-    
-    # Drop rows with "drive start" in column 'two'
-    df = df[~df['two'].str.contains('drive start', case=False)]
-    
-    # Remove rows with 'NaN' in specified columns
-    df = df.dropna(subset=['playtype', 'yards', 'outcome'], how='all')
+        # Remove rows with 'NaN' in specified columns
+        df = df.dropna(subset=['playtype', 'yards', 'outcome'], how='all')
+        s.rows = len(df)
     
     # Rearrange column order (keeping one and two for data checking right now)
-    df = df[['half', 'quarter', 'poss', 'down', 'to_go', 'playtype', 'yards', 'outcome', 'ball_half', 'yardline', 'drive', 'one', 'two']]
-    
+    return df[OUTPUT_COLUMNS + DERIVED_COLUMNS]
+
+
+def numeric_dtypes(input_path, chunksize=CHUNK_SIZE):
+    """
+    Returns the dtypes 'yards' and 'yardline' take when the whole file is
+    preprocessed at once: int if every raw row has a value, else float.
+
+    Args:
+    input_path: str. The path to the input file.
+    chunksize: int. The number of raw rows read at a time.
 
-    df.to_csv(output_path, index=False)
+    Returns:
+    dict of column name to type.
+    """
+    complete = {'yards': True, 'yardline': True}
+    with stage('preprocess.numeric_dtypes'):
+        for chunk in pd.read_csv(input_path, chunksize=chunksize):
+            chunk = chunk.dropna(how='all').astype(object)
+            if complete['yardline']:
+                complete['yardline'] = chunk.iloc[:, 0].str.contains(r'\d$', na=False).all()
+            if complete['yards']:
+                complete['yards'] = extract_yards(chunk.iloc[:, 1]).notna().all()
+            if not any(complete.values()):
+                break
+    return {column: int if whole else float for column, whole in complete.items()}
+
+
+def preprocess_chunks(input_path, chunksize=CHUNK_SIZE):
+    """
+    Preprocesses a raw file in fixed-size chunks, carrying the half,
+    quarter, possession and drive counter across chunk boundaries.
+
+    Args:
+    input_path: str. The path to the input file.
+    chunksize: int. The number of raw rows read at a time.
+
+    Yields:
+    DataFrame. The preprocessed plays of each chunk.
+    """
+    # Give the numeric columns the same dtype in every chunk, so they are
+    # written as they would be from the whole file
+    dtypes = numeric_dtypes(input_path, chunksize)
+    state = new_game_state()
+    for chunk in pd.read_csv(input_path, chunksize=chunksize):
+        with stage('preprocess.chunk', len(chunk)):
+            df = preprocess_frame(chunk, state)
+        yield df.astype(dtypes)
+
+
+def preprocess_data(input_path, output_path, chunksize=CHUNK_SIZE):
+    """
+    Preprocesses a football data file.
+
+    The file is streamed in chunks, so memory use does not grow with the
+    size of the input.
+
+    Args:
+    input_path: str. The path to the input file.
+    output_path: str. The path to the output file.
+    chunksize: int. The number of raw rows read at a time.
+
+    Returns:
+    None.
+    """
+    pd.DataFrame(columns=OUTPUT_COLUMNS).to_csv(output_path, index=False)
+    for df in preprocess_chunks(input_path, chunksize):
+        df[OUTPUT_COLUMNS].to_csv(output_path, mode='a', header=False, index=False)
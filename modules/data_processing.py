@@ -1,49 +1,174 @@
 import pandas as pd
+from modules.query_index import PlayIndex
+from modules.yard_histogram import YardHistogram
+from modules.instrumentation import instrumented
 
 def load_data():
     return pd.read_csv('data/avemaria.csv')
 
-def filter_data(data, selected_teams, selected_downs, selected_playtypes, selected_yards_range):
-    return data[
-        (data['poss'].isin(selected_teams)) & 
-        (data['down'] == selected_downs) & 
-        (data['yards'] >= selected_yards_range[0]) & (data['yards'] <= selected_yards_range[1]) &
-  	    (data['playtype'].isin(selected_playtypes))
-    ]
-
-def compute_team_stats(data, team):
-    # Convert the values in the 'poss' column to lowercase
-    data['poss'] = data['poss'].str.lower()
-    data['playtype'] = data['playtype'].str.lower()
-    data['ball_half'] = data['ball_half'].str.lower()
-    data['outcome'] = data['outcome'].str.lower()
-
-    team_data = data[data['poss'] == team.lower()]
-    
-    total_plays = team_data.shape[0]
-    pass_plays = team_data[team_data['playtype'] == 'pass'].shape[0]
-    rush_plays = team_data[team_data['playtype'] == 'rush'].shape[0]
-    
-    percent_pass_plays = pass_plays / total_plays if total_plays > 0 else 0
-    percent_rush_plays = rush_plays / total_plays if total_plays > 0 else 0
-
-    scores = team_data[team_data['outcome'].isin(['touchdown', 'field goal'])].shape[0]
-    total_drives = team_data['drive'].nunique()
-    drives_per_score = scores / total_drives if total_drives > 0 else 0
-
-    first_downs = team_data[team_data['down'] == '1st'].shape[0]
-    first_downs_per_drive = (first_downs - total_drives) / total_drives if total_drives > 0 else 0
-    first_down_rate = (first_downs - total_drives) / total_plays if total_plays > 0 else 0
+@instrumented('stats.filter')
+def filter_data(data, selected_teams, selected_downs, selected_playtypes, selected_yards_range, index=None):
+    """
+    Returns the plays matching the sidebar selections.
+
+    Args:
+    data: DataFrame. The preprocessed plays.
+    selected_teams: list. Teams to keep.
+    selected_downs: str. The down to keep.
+    selected_playtypes: list. Play types to keep.
+    selected_yards_range: tuple. Inclusive (min, max) yards.
+    index: PlayIndex. A query index built over data. Build it once per
+    dataset and pass it in; one is built here otherwise.
+
+    Returns:
+    DataFrame.
+    """
+    if index is None:
+        index = PlayIndex(data)
+    return index.query(selected_teams, selected_downs, selected_playtypes, selected_yards_range)
+
+DOWNS = ['1st', '2nd', '3rd', '4th']
+
+# Per-play metrics that are summed within each group of the stats table
+COUNT_METRICS = ['plays', 'pass_plays', 'rush_plays', 'scores', 'first_down_plays',
+                 'redzone_rushes', 'redzone_passes', 'passes_under_5_to_go', 'runs_over_5_to_go',
+                 'explosive_plays', 'explosive_passes', 'explosive_rushes', 'explosive_tds']
+YARD_METRICS = ['yards', 'pass_yards', 'rush_yards', 'explosive_yards']
+
+
+@instrumented('stats.table')
+def compute_stats_table(data, explosive_play_yards=15):
+    """
+    Computes the team, down and explosive-play metrics for every team in
+    one grouped pass.
+
+    Teams are matched case-insensitively. The result is indexed by
+    (team, down), where team is the lowercased name and down is one of
+    DOWNS, or 'All' for the team's totals. 'team_name' holds the first
+    spelling of the team seen in the data. 'drives' and 'yards_per_drive'
+    are only set on the 'All' rows.
+
+    Args:
+    data: DataFrame. The preprocessed plays. Not modified.
+    explosive_play_yards: int. The minimum yards for an explosive play.
+
+    Returns:
+    DataFrame.
+    """
+    team = data['poss'].str.lower().rename('team')
+    down = data['down'].rename('down')
+    playtype = data['playtype'].str.lower()
+    outcome = data['outcome'].str.lower()
+    yards = data['yards']
+    to_go = pd.to_numeric(data['to_go'].astype(object), errors='coerce')
+
+    is_pass = playtype == 'pass'
+    is_rush = playtype == 'rush'
+    in_redzone = (data['ball_half'].str.lower() == 'opponents') & (data['yardline'] <= 20)
+    explosive = yards >= explosive_play_yards
+
+    metrics = pd.DataFrame({
+        'plays': 1,
+        'pass_plays': is_pass,
+        'rush_plays': is_rush,
+        'scores': outcome.isin(['touchdown', 'field goal']),
+        'first_down_plays': down == '1st',
+        'redzone_rushes': is_rush & in_redzone,
+        'redzone_passes': is_pass & in_redzone,
+        'passes_under_5_to_go': is_pass & (to_go < 5),
+        'runs_over_5_to_go': is_rush & (to_go > 5),
+        'explosive_plays': explosive,
+        'explosive_passes': explosive & is_pass,
+        'explosive_rushes': explosive & is_rush,
+        'explosive_tds': explosive & (outcome == 'touchdown'),
+        'yards': yards,
+        'pass_yards': yards.where(is_pass),
+        'rush_yards': yards.where(is_rush),
+        'explosive_yards': yards.where(explosive),
+    }, index=data.index)
+
+    by_down = metrics.groupby([team, down], sort=False, dropna=False, observed=True).sum()
+    by_down = by_down[by_down.index.get_level_values('team').notna()]
+
+    # Drives are numbered per game, so include the game when there is one
+    drive_keys = [team, data['drive']]
+    if 'game_id' in data.columns:
+        drive_keys.insert(1, data['game_id'])
+    drive_yards = yards.groupby(drive_keys, sort=False, observed=True).sum().groupby(level='team', sort=False)
+    drives = pd.DataFrame({'drives': drive_yards.size(), 'yards_per_drive': drive_yards.mean()})
+
+    team_names = data['poss'].groupby(team, sort=False).first()
+
+    return assemble_stats_table(by_down, drives, team_names)
+
+
+def assemble_stats_table(by_down, drives, team_names):
+    """
+    Builds the table returned by compute_stats_table from its grouped parts.
+
+    Args:
+    by_down: DataFrame. The summed metrics indexed by (team, down), with a
+    NaN down for plays that have none.
+    drives: DataFrame. 'drives' and 'yards_per_drive' indexed by team.
+    team_names: Series. The display name of each team, in display order.
+
+    Returns:
+    DataFrame.
+    """
+    teams = team_names.index
+    totals = by_down.groupby(level='team', sort=False).sum().reindex(teams)
+    totals = totals.join(drives)
+
+    totals.index = pd.MultiIndex.from_product([teams, ['All']], names=['team', 'down'])
+    table = pd.concat([totals, by_down[by_down.index.get_level_values('down').isin(DOWNS)]])
+    table = table.reindex(pd.MultiIndex.from_product([teams, ['All'] + DOWNS], names=['team', 'down']))
+
+    table[COUNT_METRICS] = table[COUNT_METRICS].fillna(0).astype(int)
+    table[YARD_METRICS] = table[YARD_METRICS].fillna(0)
+    table['team_name'] = team_names.reindex(table.index.get_level_values('team')).to_numpy()
+
+    return table
 
-    redzone_rushes = int(team_data[(team_data['playtype'] == 'rush') & 
-                               (team_data['ball_half'] == 'opponents') & 
-                               (team_data['yardline'] <= 20)].shape[0])
-    
-    redzone_passes = int(team_data[(team_data['playtype'] == 'pass') & 
-                               (team_data['ball_half'] == 'opponents') & 
-                               (team_data['yardline'] <= 20)].shape[0])
 
-    total_yards_per_drive = team_data.groupby('drive')['yards'].sum().mean()
+def team_totals(stats, team):
+    """
+    Returns the 'All' row of the stats table for a team, or an all-zero row
+    if the team has no plays.
+    """
+    key = (team.lower(), 'All')
+    if key in stats.index:
+        return stats.loc[key]
+    row = pd.Series(0, index=stats.columns, dtype=object)
+    row['yards_per_drive'] = float('nan')
+    return row
+
+
+@instrumented('stats.team')
+def compute_team_stats(data, team, stats=None):
+    """
+    Formats the headline stats for one team.
+
+    Args:
+    data: DataFrame. The preprocessed plays.
+    team: str. The team, matched case-insensitively.
+    stats: DataFrame. A table from compute_stats_table, if already computed.
+
+    Returns:
+    dict of display name to formatted value.
+    """
+    if stats is None:
+        stats = compute_stats_table(data)
+    row = team_totals(stats, team)
+
+    total_plays = int(row['plays'])
+    total_drives = int(row['drives'])
+    first_downs = int(row['first_down_plays'])
+
+    percent_pass_plays = row['pass_plays'] / total_plays if total_plays > 0 else 0
+    percent_rush_plays = row['rush_plays'] / total_plays if total_plays > 0 else 0
+    drives_per_score = row['scores'] / total_drives if total_drives > 0 else 0
+    first_downs_per_drive = (first_downs - total_drives) / total_drives if total_drives > 0 else 0
+    first_down_rate = (first_downs - total_drives) / total_plays if total_plays > 0 else 0
 
     team_stats = {
         'Total Plays': total_plays,
@@ -52,115 +177,125 @@ def compute_team_stats(data, team):
         'Drives per Score': f'{drives_per_score:.2f}',
         '1st Downs per Drive': f'{first_downs_per_drive:.2f}',
         '1st Down Rate': f'{first_down_rate * 100:.2f}%',
-        'Runs in Red Zone': redzone_rushes,
-        'Passes in Red Zone': redzone_passes,
-        'Average Yards per Drive': f'{total_yards_per_drive:.2f}',
+        'Runs in Red Zone': int(row['redzone_rushes']),
+        'Passes in Red Zone': int(row['redzone_passes']),
+        'Average Yards per Drive': f'{row["yards_per_drive"]:.2f}',
     }
 
     return team_stats
   
 
-def compute_explosive_play_stats(data, explosive_play_yards=15):
-    # Initialize an empty list to store the stats for each team
-    explosive_play_stats = []
-
-    # Loop over each unique team
-    for team in data['poss'].unique():
-        # Filter the data for the current team
-        team_data = data[data['poss'].str.lower() == team.lower()]
-
-        # Compute the total yards for the team
-        total_yards = team_data['yards'].sum()
-
-        # Filter the data for explosive plays
-        explosive_data = team_data[team_data['yards'] >= explosive_play_yards]
-
-        # Compute the required statistics
-        total_explosive_plays = explosive_data.shape[0]
-        explosive_passes = explosive_data[explosive_data['playtype'].str.lower() == 'pass'].shape[0]
-        explosive_rushes = explosive_data[explosive_data['playtype'].str.lower() == 'rush'].shape[0]
-        explosive_tds = explosive_data[explosive_data['outcome'].str.lower() == 'touchdown'].shape[0]
-        total_yards_from_ex = explosive_data['yards'].sum()
-        avg_yards_per_ex = round(total_yards_from_ex / total_explosive_plays, 2) if total_explosive_plays > 0 else 0
-        perc_of_total_yards_from_ex = round((total_yards_from_ex / total_yards) * 100, 2) if total_yards > 0 else 0
-      
-        # Add the stats for the current team to the list
-        explosive_play_stats.append([
-            team,
-            total_explosive_plays,
-            explosive_passes,
-            explosive_rushes,
-            explosive_tds,
-            total_yards_from_ex,
-            avg_yards_per_ex,
-            perc_of_total_yards_from_ex
-        ])
-
-    # Convert the list to a DataFrame and add column names
-    explosive_play_stats_df = pd.DataFrame(explosive_play_stats, columns=[
-        'Team',
-        'Total Explosive Plays',
-        'Explosive Passes',
-        'Explosive Rushes',
-        'Explosive TDs',
-        'Total Yards from Ex',
-        'Avg Yards per Ex',
-        '% of Total Yards from Ex'
-    ])
+@instrumented('stats.explosive')
+def compute_explosive_play_stats(data, explosive_play_yards=15, stats=None, histogram=None):
+    """
+    Summarises explosive plays for every team.
+
+    Args:
+    data: DataFrame. The preprocessed plays.
+    explosive_play_yards: int. The minimum yards for an explosive play.
+    stats: DataFrame. A table from compute_stats_table computed with the
+    same explosive_play_yards, if already computed.
+    histogram: YardHistogram. Cumulative yardage built over data. When
+    given, any threshold is answered from it without a pass over the plays.
+
+    Returns:
+    DataFrame indexed by team.
+    """
+    if histogram is not None:
+        totals = histogram.explosive_totals(explosive_play_yards)
+    else:
+        if stats is None:
+            stats = compute_stats_table(data, explosive_play_yards)
+        totals = stats.xs('All', level='down')
+    return format_explosive_stats(totals)
+
+
+def format_explosive_stats(totals):
+    """
+    Formats explosive-play totals, one row per team, for display.
+    """
+    total_explosive_plays = totals['explosive_plays']
+    total_yards_from_ex = totals['explosive_yards']
+    avg_yards_per_ex = (total_yards_from_ex / total_explosive_plays.where(total_explosive_plays > 0)).round(2).fillna(0)
+    perc_of_total_yards_from_ex = (total_yards_from_ex / totals['yards'].where(totals['yards'] > 0) * 100).round(2).fillna(0)
+
+    explosive_play_stats_df = pd.DataFrame({
+        'Team': totals['team_name'],
+        'Total Explosive Plays': total_explosive_plays,
+        'Explosive Passes': totals['explosive_passes'],
+        'Explosive Rushes': totals['explosive_rushes'],
+        'Explosive TDs': totals['explosive_tds'],
+        'Total Yards from Ex': total_yards_from_ex,
+        'Avg Yards per Ex': avg_yards_per_ex,
+        '% of Total Yards from Ex': perc_of_total_yards_from_ex,
+    })
 
     # Set the 'Team' column as the index
     explosive_play_stats_df.set_index('Team', inplace=True)
 
     return explosive_play_stats_df
 
-def compute_down_stats(data, team):
-    down_stats = []
-  
-    # Ensure 'to_go' is numeric
-    data['to_go'] = pd.to_numeric(data['to_go'], errors='coerce')
-
-    for down in ['1st', '2nd', '3rd', '4th']:
-        down_data = data[(data['poss'] == team) & (data['down'] == down)]
-
-        total_yards = down_data['yards'].sum()
-
-        pass_plays = down_data[down_data['playtype'] == 'pass']
-        num_pass_plays = pass_plays.shape[0]
-        total_pass_yards = pass_plays['yards'].sum()
-
-        rush_plays = down_data[down_data['playtype'] == 'rush']
-        num_rush_plays = rush_plays.shape[0]
-        total_rush_yards = rush_plays['yards'].sum()
-
-        total_team_yards = data[data['poss'] == team]['yards'].sum()
-        percent_yardage = round((total_yards / total_team_yards) * 100, 2) if total_team_yards > 0 else 0
-
-        passes_under_5_to_go = pass_plays[pass_plays['to_go'] < 5].shape[0]
-        runs_over_5_to_go = rush_plays[rush_plays['to_go'] > 5].shape[0]
-
-        down_stats.append([
-            down,
-            total_yards,
-            num_pass_plays,
-            total_pass_yards,
-            num_rush_plays,
-            total_rush_yards,
-            percent_yardage,
-            passes_under_5_to_go,
-            runs_over_5_to_go
-        ])
-
-    down_stats_df = pd.DataFrame(down_stats, columns=[
-        'Down',
-        'Total Yards Gained',
-        'Number of Pass Plays',
-        'Total Pass Yards',
-        'Number of Rush Plays',
-        'Total Rush Yards',
-        '% of Yardage Gained',
-        'Passes w/ Under 5 to go',
-        'Runs w/ Over 5 to go'
-    ])
+
+@instrumented('stats.sweep')
+def compute_explosive_sweep(data, thresholds, histogram=None):
+    """
+    Computes the explosive-play stats of every team at each threshold.
+
+    Args:
+    data: DataFrame. The preprocessed plays.
+    thresholds: list of int. The minimum yards for an explosive play.
+    histogram: YardHistogram. Cumulative yardage built over data, if
+    already built.
+
+    Returns:
+    DataFrame indexed by (threshold, team) with the columns of
+    compute_explosive_play_stats.
+    """
+    if histogram is None:
+        histogram = YardHistogram(data)
+    sweep = histogram.sweep(thresholds)
+    return pd.concat({threshold: format_explosive_stats(sweep.xs(threshold, level='threshold'))
+                      for threshold in thresholds}, names=['threshold'])
+
+@instrumented('stats.down')
+def compute_down_stats(data, team, stats=None):
+    """
+    Breaks down one team's plays and yardage by down.
+
+    Args:
+    data: DataFrame. The preprocessed plays.
+    team: str. The team, matched case-insensitively.
+    stats: DataFrame. A table from compute_stats_table, if already computed.
+
+    Returns:
+    DataFrame indexed by down.
+    """
+    if stats is None:
+        stats = compute_stats_table(data)
+
+    total_team_yards = team_totals(stats, team)['yards']
+    key = team.lower()
+    if key in stats.index.get_level_values('team'):
+        downs = stats.loc[key].reindex(DOWNS)
+    else:
+        downs = pd.DataFrame(0, index=DOWNS, columns=stats.columns)
+
+    if total_team_yards > 0:
+        percent_yardage = (downs['yards'] / total_team_yards * 100).round(2)
+    else:
+        percent_yardage = pd.Series(0, index=DOWNS)
+
+    down_stats_df = pd.DataFrame({
+        'Down': DOWNS,
+        'Total Yards Gained': downs['yards'].to_numpy(),
+        'Number of Pass Plays': downs['pass_plays'].to_numpy(),
+        'Total Pass Yards': downs['pass_yards'].to_numpy(),
+        'Number of Rush Plays': downs['rush_plays'].to_numpy(),
+        'Total Rush Yards': downs['rush_yards'].to_numpy(),
+        '% of Yardage Gained': percent_yardage.to_numpy(),
+        'Passes w/ Under 5 to go': downs['passes_under_5_to_go'].to_numpy(),
+        'Runs w/ Over 5 to go': downs['runs_over_5_to_go'].to_numpy(),
+    })
 
     down_stats_df.set_index('Down', inplace=True)
 
@@ -0,0 +1,109 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from modules import game_cache
+
+# Datasets kept in the registry at once; the least recently used is dropped
+# first. Sessions still holding a dropped frame keep it alive until they
+# finish with it.
+MAX_DATASETS = 8
+
+# One frame per content hash for the whole process, shared by every session
+_datasets = OrderedDict()
+_lock = threading.Lock()
+# Held while a dataset is loaded, so two sessions uploading the same file
+# at once load it only once
+_loading = {}
+
+
+# Nullable columns, held as a values array plus a missing-value mask
+MASKED_ARRAYS = (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+
+def freeze(df):
+    """
+    Returns df with every column backed by a read-only array.
+
+    Writing into the frame in place (df.loc[...] = ..., df[column] += ...,
+    Series.fillna(inplace=True)) then raises ValueError instead of
+    changing the data other sessions see. Arrays that are already
+    read-only, such as categorical codes memory-mapped from the cache, are
+    reused without copying.
+
+    Args:
+    df: DataFrame. The frame to freeze. Should not be used afterwards.
+
+    Returns:
+    DataFrame.
+    """
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        array = series.array
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = array.codes
+            if codes.flags.writeable:
+                codes = _read_only(codes.copy())
+            columns[column] = pd.Categorical.from_codes(codes, dtype=series.dtype)
+        elif isinstance(array, MASKED_ARRAYS):
+            mask = _read_only(series.isna().to_numpy())
+            values = _read_only(series.to_numpy(dtype=series.dtype.numpy_dtype, na_value=0))
+            columns[column] = type(array)(values, mask)
+        elif isinstance(series.dtype, np.dtype):
+            columns[column] = _read_only(series.to_numpy(copy=True))
+        else:
+            columns[column] = array
+    # copy=False keeps each array as its own block instead of consolidating
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def get_dataset(key, raw_bytes):
+    """
+    Returns the shared, read-only plays for an uploaded game.
+
+    The first session to ask for a dataset loads it through the game cache
+    and freezes it; every later session gets the same frame. Callers must
+    treat it as immutable: derive new frames from it rather than adding or
+    replacing its columns.
+
+    Args:
+    key: str. The content hash of the raw file.
+    raw_bytes: bytes. The contents of the raw game CSV.
+
+    Returns:
+    DataFrame. The typed preprocessed plays.
+    """
+    with _lock:
+        if key in _datasets:
+            _datasets.move_to_end(key)
+            return _datasets[key]
+        loading = _loading.setdefault(key, threading.Lock())
+
+    with loading:
+        with _lock:
+            if key in _datasets:
+                return _datasets[key]
+        try:
+            df = freeze(game_cache.load_preprocessed(raw_bytes, key=key))
+            with _lock:
+                _datasets[key] = df
+                while len(_datasets) > MAX_DATASETS:
+                    _datasets.popitem(last=False)
+        finally:
+            with _lock:
+                _loading.pop(key, None)
+    return df
+
+
+def clear():
+    """
+    Drops every dataset from the registry.
+    """
+    with _lock:
+        _datasets.clear()
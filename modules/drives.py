@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from modules.data_preprocessing import derived_column
+
+# Drive results, checked in this order when a drive has more than one
+RESULTS = ['Touchdown', 'Field Goal', 'Safety', 'Missed Field Goal', 'Turnover', 'Punt', 'Kickoff']
+
+# A touchdown scores one more point with a good kick attempt. A safety
+# scores for the defense, so it counts against the drive's offense.
+TOUCHDOWN_POINTS = 6
+FIELD_GOAL_POINTS = 3
+SAFETY_POINTS = 2
+
+DRIVE_COLUMNS = ['team', 'quarter', 'start_position', 'end_position', 'plays', 'yards',
+                 'first_downs', 'red_zone', 'result', 'points']
+
+# Plays that do not start from a down-and-distance situation
+NON_SCRIMMAGE_PLAYTYPES = ['kickoff', 'kick attempt']
+
+
+def field_position(plays):
+    """
+    Returns each play's distance from the offense's own goal line, in yards.
+    """
+    return derived_column(plays, 'field_position').astype(float)
+
+
+def compute_drives(plays):
+    """
+    Summarises preprocessed plays into one row per drive.
+
+    Args:
+    plays: DataFrame. Preprocessed plays of one game, or of a season with a
+    'game_id' column. Plays without the DERIVED_COLUMNS of preprocess_frame
+    need 'one' and 'two'.
+
+    Returns:
+    DataFrame indexed by drive, or by (game_id, drive) for a season, with
+    the columns in DRIVE_COLUMNS. Positions are yards from the offense's
+    own goal line, and they and the play count only cover scrimmage plays.
+    'result' is one of RESULTS or 'Other'. 'points' counts touchdowns
+    (plus a good kick attempt) and made field goals for the offense, and
+    safeties against it.
+    """
+    plays = plays[plays['poss'].notna()]
+    keys = ['game_id', 'drive'] if 'game_id' in plays.columns else ['drive']
+
+    position = field_position(plays)
+    playtype = plays['playtype'].astype(object).str.lower()
+    outcome = plays['outcome'].astype(object).str.lower()
+    scrimmage = ~playtype.isin(NON_SCRIMMAGE_PLAYTYPES)
+    field_goal = playtype == 'field goal'
+    made = derived_column(plays, 'field_goal_made').fillna(False).astype(bool)
+
+    frame = pd.DataFrame({
+        'team': plays['poss'].astype(object),
+        'quarter': plays['quarter'].astype(float),
+        # The kick attempt after a touchdown and the kickoff that follows a
+        # score stay in the drive, but not in its positions or play count
+        'position': position.where(scrimmage),
+        'scrimmage': scrimmage,
+        'yards': plays['yards'].astype(float),
+        'first_down': outcome == '1st down',
+        'red_zone': position >= 80,
+        'touchdown': outcome == 'touchdown',
+        'kick_good': outcome == 'kick attempt good',
+        'field_goal': made,
+        'missed_field_goal': field_goal & ~made,
+        'safety': derived_column(plays, 'special').astype(object) == 'Safety',
+        'turnover': outcome.isin(['interception', 'fumble']),
+        'punt': playtype == 'punt',
+        'kickoff': playtype == 'kickoff',
+    }, index=plays.index)
+    for key in keys:
+        frame[key] = plays[key]
+
+    drives = frame.groupby(keys, sort=False, observed=True).agg(
+        team=('team', 'first'),
+        quarter=('quarter', 'first'),
+        start_position=('position', 'first'),
+        end_position=('position', 'last'),
+        plays=('scrimmage', 'sum'),
+        yards=('yards', 'sum'),
+        first_downs=('first_down', 'sum'),
+        red_zone=('red_zone', 'any'),
+        touchdown=('touchdown', 'any'),
+        kick_good=('kick_good', 'any'),
+        field_goal=('field_goal', 'any'),
+        missed_field_goal=('missed_field_goal', 'any'),
+        safety=('safety', 'any'),
+        turnover=('turnover', 'any'),
+        punt=('punt', 'any'),
+        kickoff=('kickoff', 'any'),
+    )
+
+    drives['result'] = np.select([drives[result.lower().replace(' ', '_')] for result in RESULTS], RESULTS, 'Other')
+    drives['points'] = np.select(
+        [drives['touchdown'], drives['field_goal'], drives['safety']],
+        [TOUCHDOWN_POINTS + drives['kick_good'], FIELD_GOAL_POINTS, -SAFETY_POINTS],
+        0,
+    )
+
+    drives['quarter'] = drives['quarter'].astype('Int8')
+    return drives[DRIVE_COLUMNS]
+
@@ -0,0 +1,267 @@
+import numpy as np
+import pandas as pd
+from modules.data_preprocessing import derived_column
+from modules.drives import NON_SCRIMMAGE_PLAYTYPES, compute_drives, field_position
+from modules.instrumentation import instrumented
+
+EP_TABLE_PATH = './data/expected_points.npy'
+
+DOWNS = ['1st', '2nd', '3rd', '4th']
+
+# Yards to go buckets: 1-3, 4-6, 7-10, 11-15 and 16 or more
+DISTANCE_EDGES = [3, 6, 10, 15]
+
+# Field position buckets of 10 yards from the offense's own goal line
+FIELD_BUCKETS = 10
+
+TABLE_SHAPE = (len(DOWNS), len(DISTANCE_EDGES) + 1, FIELD_BUCKETS)
+
+# Cells with few plays are pulled towards the average of their field
+# position bucket by this many plays' worth of weight
+PRIOR_WEIGHT = 10
+
+# The share of the yards to go a play must gain to count as a success, by down
+SUCCESS_SHARE = [0.4, 0.6, 1.0, 1.0]
+
+
+def play_states(plays):
+    """
+    Locates each play in the expected points table.
+
+    Args:
+    plays: DataFrame. The preprocessed plays. Not modified.
+
+    Returns:
+    tuple of (cell, down, distance). cell is the flat table index of each
+    play's down, distance and field position, or -1 for plays without
+    one. down is the down number from 0 to 3, or -1. distance is the
+    yards to go, with 'GOAL' replaced by the yards to the goal line.
+    """
+    down = plays['down'].astype(object).map({d: i for i, d in enumerate(DOWNS)}).to_numpy(dtype=float, na_value=np.nan)
+    position = field_position(plays).to_numpy(dtype=float, na_value=np.nan)
+    to_go = plays['to_go'].astype(object)
+    distance = pd.to_numeric(to_go, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    goal = (to_go.astype(str).str.upper() == 'GOAL').to_numpy()
+    distance[goal] = 100 - position[goal]
+
+    scrimmage = ~plays['playtype'].astype(object).str.lower().isin(NON_SCRIMMAGE_PLAYTYPES).to_numpy()
+    valid = scrimmage & ~np.isnan(down) & ~np.isnan(distance) & ~np.isnan(position)
+
+    down = np.where(valid, np.nan_to_num(down, nan=-1), -1).astype(np.int64)
+    distance_bucket = np.searchsorted(DISTANCE_EDGES, np.nan_to_num(distance), side='left')
+    field_bucket = np.clip(np.nan_to_num(position) // (100 // FIELD_BUCKETS), 0, FIELD_BUCKETS - 1).astype(np.int64)
+    cell = np.ravel_multi_index((np.clip(down, 0, None), distance_bucket, field_bucket), TABLE_SHAPE)
+    return np.where(valid, cell, -1), down, distance
+
+
+def game_halves(plays):
+    """
+    Returns a key that is the same for plays in the same half of the same game.
+    """
+    halves = [plays['half'].astype(float)]
+    if 'game_id' in plays.columns:
+        halves.insert(0, plays['game_id'].astype(object))
+    return pd.MultiIndex.from_arrays(halves).factorize()[0]
+
+
+def drive_points(plays):
+    """
+    Returns the points of each play's drive from compute_drives, for the
+    team in possession, or NaN for plays without one. Fitting and scoring
+    both count points this way.
+    """
+    owned = plays[plays['poss'].notna()]
+    keys = ['game_id', 'drive'] if 'game_id' in owned.columns else ['drive']
+    drives = compute_drives(owned)
+    # Grouped the same way as compute_drives, so codes are its row positions
+    drive = owned.groupby([owned[key] for key in keys], sort=False, observed=True).ngroup().to_numpy()
+    points = drives['points'].to_numpy(dtype=float)[drive]
+    return pd.Series(points, index=owned.index).reindex(plays.index)
+
+
+def next_score(plays):
+    """
+    Returns the points of the next score in the half, for each play, from
+    the point of view of the team in possession: positive when it scores
+    next, negative when its opponent does, 0 when nobody scores again.
+    """
+    owned = plays[plays['poss'].notna()]
+    points = drive_points(owned)
+    team = owned['poss'].astype(object).str.lower()
+    # The first scoring drive at or after each play in the same half, and
+    # the team that had the ball on it
+    group = game_halves(owned)
+    scored = points != 0
+    scorer = team.where(scored).groupby(group).bfill()
+    points = points.where(scored).groupby(group).bfill()
+
+    value = np.where(scorer.isna(), 0, np.where(scorer == team, points, -points))
+    return pd.Series(value, index=owned.index).reindex(plays.index)
+
+
+@instrumented('ep.fit')
+def fit_expected_points(plays, prior_weight=PRIOR_WEIGHT):
+    """
+    Fits the expected points of every down, distance and field position
+    from a season of plays.
+
+    Each cell is the average points of the next score in the half after
+    plays in that situation. Cells with few plays are shrunk towards their
+    field position bucket, which is itself shrunk towards the overall
+    average.
+
+    Args:
+    plays: DataFrame. The preprocessed plays of a season, with 'game_id'.
+    prior_weight: float. How many plays the prior counts for in each cell.
+
+    Returns:
+    ndarray of float32 with shape TABLE_SHAPE.
+    """
+    cell, _, _ = play_states(plays)
+    value = next_score(plays).to_numpy()
+    valid = (cell >= 0) & ~np.isnan(value)
+    cell, value = cell[valid], value[valid]
+
+    size = int(np.prod(TABLE_SHAPE))
+    counts = np.bincount(cell, minlength=size).reshape(TABLE_SHAPE)
+    sums = np.bincount(cell, weights=value, minlength=size).reshape(TABLE_SHAPE)
+
+    overall = sums.sum() / counts.sum() if counts.sum() else 0.0
+    field_prior = (sums.sum(axis=(0, 1)) + prior_weight * overall) / (counts.sum(axis=(0, 1)) + prior_weight)
+    table = (sums + prior_weight * field_prior) / (counts + prior_weight)
+    return table.astype(np.float32)
+
+
+def save_table(table, path=EP_TABLE_PATH):
+    np.save(path, table.astype(np.float32))
+
+
+def load_table(path=EP_TABLE_PATH):
+    """
+    Loads a table saved by save_table, or returns None if there is none.
+
+    Raises:
+    ValueError: The file holds a table of a different shape.
+    """
+    try:
+        table = np.load(path)
+    except FileNotFoundError:
+        return None
+    if table.shape != TABLE_SHAPE:
+        raise ValueError(f"Expected points table {path} has shape {table.shape}, not {TABLE_SHAPE}")
+    return table
+
+
+@instrumented('ep.score')
+def score_plays(plays, table):
+    """
+    Scores every play with the expected points table.
+
+    The expected points after a play are those of the next play in the
+    half, negated if the other team has the ball. After a touchdown, made
+    field goal or safety they are its drive's points, as counted when
+    fitting. Plays that are not from a down-and-distance situation get no
+    score.
+
+    Args:
+    plays: DataFrame. The preprocessed plays. Not modified. Plays without
+    the DERIVED_COLUMNS of preprocess_frame need 'one' and 'two'.
+    table: ndarray. From fit_expected_points or load_table.
+
+    Returns:
+    DataFrame aligned with plays with 'ep', 'epa' and 'success'.
+    """
+    cell, down, distance = play_states(plays)
+    valid = cell >= 0
+    ep = np.where(valid, table.ravel()[np.clip(cell, 0, None)], np.nan)
+
+    # Expected points of the next scrimmage play in the same half
+    team = plays['poss'].astype(object).str.lower().to_numpy()
+    group = game_halves(plays)
+    positions = np.flatnonzero(valid)
+    next_ep = np.zeros(len(plays))
+    if len(positions):
+        same_half = np.append(group[positions][1:] == group[positions][:-1], False)
+        following = np.append(positions[1:], positions[-1])
+        same_team = team[following] == team[positions]
+        after = np.where(same_team, ep[following], -ep[following])
+        next_ep[positions] = np.where(same_half, after, 0)
+
+    outcome = plays['outcome'].astype(object).str.lower().to_numpy()
+    playtype = plays['playtype'].astype(object).str.lower().to_numpy()
+    field_goal_made = derived_column(plays, 'field_goal_made').fillna(False).to_numpy(dtype=bool)
+    safety = (derived_column(plays, 'special').astype(object) == 'Safety').to_numpy()
+    scoring = (outcome == 'touchdown') | field_goal_made | safety
+    next_ep = np.where(scoring, drive_points(plays).to_numpy(), next_ep)
+    epa = np.where(valid, next_ep - ep, np.nan)
+
+    # Success is gaining enough of the yards to go, on rushes and passes only
+    yards = plays['yards'].to_numpy(dtype=float, na_value=np.nan)
+    required = distance * np.asarray(SUCCESS_SHARE)[np.clip(down, 0, None)]
+    success = pd.array((yards >= required) | (outcome == 'touchdown'), dtype='boolean')
+    success[~(valid & np.isin(playtype, ['rush', 'pass']))] = pd.NA
+
+    return pd.DataFrame({'ep': ep, 'epa': epa, 'success': success}, index=plays.index)
+
+
+def summarise(plays, scored, keys):
+    frame = pd.DataFrame({
+        'team': plays['poss'].astype(object).str.lower(),
+        'down': plays['down'].astype(object),
+        'epa': scored['epa'],
+        'success': scored['success'].astype(float),
+    })
+    frame = frame[frame['epa'].notna()]
+    summary = frame.groupby(keys, sort=False).agg(
+        plays=('epa', 'size'),
+        total_epa=('epa', 'sum'),
+        epa_per_play=('epa', 'mean'),
+        success_rate=('success', 'mean'),
+    )
+    return pd.DataFrame({
+        'Plays': summary['plays'],
+        'Total EPA': summary['total_epa'].round(2),
+        'EPA per Play': summary['epa_per_play'].round(3),
+        'Success Rate': (summary['success_rate'] * 100).round(2).fillna(0),
+    })
+
+
+@instrumented('ep.team')
+def compute_team_epa(plays, scored):
+    """
+    Summarises expected points added and success rate for every team.
+
+    Args:
+    plays: DataFrame. The preprocessed plays.
+    scored: DataFrame. From score_plays.
+
+    Returns:
+    DataFrame indexed by team.
+    """
+    summary = summarise(plays, scored, ['team'])
+    names = plays['poss'].astype(object).groupby(plays['poss'].astype(object).str.lower(), sort=False).first()
+    summary.index = names.reindex(summary.index).rename('Team')
+    return summary
+
+
+@instrumented('ep.down')
+def compute_down_epa(plays, team, scored):
+    """
+    Breaks down one team's expected points added and success rate by down.
+
+    Args:
+    plays: DataFrame. The preprocessed plays.
+    team: str. The team, matched case-insensitively.
+    scored: DataFrame. From score_plays.
+
+    Returns:
+    DataFrame indexed by down.
+    """
+    summary = summarise(plays, scored, ['team', 'down'])
+    key = team.lower()
+    if key in summary.index.get_level_values('team'):
+        downs = summary.loc[key].reindex(DOWNS).fillna(0)
+    else:
+        downs = pd.DataFrame(0.0, index=DOWNS, columns=summary.columns)
+    downs['Plays'] = downs['Plays'].astype(int)
+    return downs.rename_axis('Down')
@@ -0,0 +1,140 @@
+import csv
+import os
+import re
+import pandas as pd
+from openpyxl import Workbook
+from modules.data_processing import (compute_stats_table, compute_team_stats, compute_explosive_play_stats,
+                                     compute_down_stats)
+from modules.drives import compute_drives
+from modules.instrumentation import stage
+
+# The sections written for each team, in order
+SECTIONS = ['Team Stats', 'Breakdown by Down', 'Explosive Plays', 'Drives']
+
+# Characters Excel does not allow in sheet names, and the longest name it allows
+INVALID_SHEET_CHARACTERS = re.compile(r'[\[\]:*?/\\]')
+MAX_SHEET_NAME = 31
+
+
+def team_reports(plays, explosive_play_yards=15):
+    """
+    Yields the report sections of every team.
+
+    The stats table, explosive play summary and drive table are each
+    computed once for all teams; each team's sections are lookups into
+    them, so only one team's sections are held at a time.
+
+    Args:
+    plays: DataFrame. The preprocessed plays. Not modified.
+    explosive_play_yards: int. The minimum yards for an explosive play.
+
+    Yields:
+    tuple of (team name, dict of section name to DataFrame).
+    """
+    stats = compute_stats_table(plays, explosive_play_yards)
+    explosive = compute_explosive_play_stats(plays, explosive_play_yards, stats)
+    drives = compute_drives(plays).reset_index()
+    drive_teams = drives['team'].str.lower()
+
+    for team_name in stats.xs('All', level='down')['team_name']:
+        team_stats = compute_team_stats(plays, team_name, stats)
+        yield team_name, {
+            'Team Stats': pd.DataFrame({'Value': team_stats}).rename_axis('Stat'),
+            'Breakdown by Down': compute_down_stats(plays, team_name, stats),
+            'Explosive Plays': explosive.loc[[team_name]].astype(object).iloc[0].rename('Value').to_frame().rename_axis('Stat'),
+            'Drives': drives[drive_teams == team_name.lower()].drop(columns='team').set_index(drives.columns[0]),
+        }
+
+
+def frame_rows(df):
+    """
+    Yields a frame as rows of plain values, header first, with the index as
+    the leading columns and None for missing values.
+    """
+    names = [name or '' for name in df.index.names]
+    yield names + [str(column) for column in df.columns]
+    for row in df.reset_index().itertuples(index=False, name=None):
+        yield [None if pd.isna(value) else value.item() if hasattr(value, 'item') else value for value in row]
+
+
+def sheet_name(team_name, used):
+    """
+    Returns a valid Excel sheet name for a team that is not in used.
+    """
+    base = INVALID_SHEET_CHARACTERS.sub('_', str(team_name))[:MAX_SHEET_NAME] or 'Team'
+    name, suffix = base, 2
+    while name.lower() in used:
+        name = f"{base[:MAX_SHEET_NAME - len(str(suffix)) - 1]} {suffix}"
+        suffix += 1
+    used.add(name.lower())
+    return name
+
+
+def export_workbook(plays, output, explosive_play_yards=15):
+    """
+    Writes an Excel workbook with one sheet per team.
+
+    Each sheet holds the team's stats, down breakdown, explosive plays and
+    drive summaries, one section under another. The workbook is written in
+    openpyxl's write-only mode, so rows are streamed to the file rather
+    than kept in memory.
+
+    Args:
+    plays: DataFrame. The preprocessed plays of a game or season.
+    output: str or file object. Where to save the workbook.
+    explosive_play_yards: int. The minimum yards for an explosive play.
+
+    Returns:
+    int. The number of team sheets written.
+    """
+    workbook = Workbook(write_only=True)
+    used = set()
+    teams = 0
+    for team_name, sections in team_reports(plays, explosive_play_yards):
+        with stage('export.sheet') as s:
+            sheet = workbook.create_sheet(sheet_name(team_name, used))
+            sheet.append([team_name])
+            for section in SECTIONS:
+                sheet.append([])
+                sheet.append([section])
+                for row in frame_rows(sections[section]):
+                    sheet.append(row)
+            s.rows = len(sections['Drives'])
+        teams += 1
+    with stage('export.save', teams):
+        workbook.save(output)
+    return teams
+
+
+def export_csv(plays, directory, explosive_play_yards=15):
+    """
+    Writes one CSV per report section, each holding every team's rows
+    with a leading 'team' column.
+
+    Args:
+    plays: DataFrame. The preprocessed plays of a game or season.
+    directory: str. The directory to write the CSV files into.
+    explosive_play_yards: int. The minimum yards for an explosive play.
+
+    Returns:
+    list of str. The paths written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {section: os.path.join(directory, section.lower().replace(' ', '_') + '.csv') for section in SECTIONS}
+    files = {section: open(path, 'w', newline='') for section, path in paths.items()}
+    try:
+        writers = {section: csv.writer(f) for section, f in files.items()}
+        header_written = set()
+        for team_name, sections in team_reports(plays, explosive_play_yards):
+            for section, df in sections.items():
+                rows = frame_rows(df)
+                header = next(rows)
+                if section not in header_written:
+                    writers[section].writerow(['team'] + header)
+                    header_written.add(section)
+                for row in rows:
+                    writers[section].writerow([team_name] + row)
+    finally:
+        for f in files.values():
+            f.close()
+    return list(paths.values())
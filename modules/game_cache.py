@@ -0,0 +1,140 @@
+import hashlib
+import io
+import os
+import pandas as pd
+from pyarrow import feather
+from modules.data_preprocessing import preprocess_frame
+from modules.play_schema import apply_schema
+from modules.instrumentation import stage
+
+CACHE_DIR = './data/cache'
+
+# Part of every cache file name. Bump it whenever preprocessing or the play
+# schema changes, so games parsed by older code are parsed again.
+CACHE_VERSION = 5
+
+# Least recently used games are evicted once the cache grows past this size
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+
+def content_hash(raw_bytes):
+    """
+    Returns the hex SHA-256 digest of a raw game file's contents.
+    """
+    return hashlib.sha256(raw_bytes).hexdigest()
+
+
+def cache_path(key, cache_dir=CACHE_DIR):
+    """
+    Returns the path of the cached Feather file for a content hash.
+    """
+    return os.path.join(cache_dir, f'{key}.v{CACHE_VERSION}.feather')
+
+
+def read_cached(key, cache_dir=CACHE_DIR):
+    """
+    Reads a preprocessed game from the cache.
+
+    Args:
+    key: str. The content hash of the raw file.
+    cache_dir: str. The cache directory.
+
+    Returns:
+    DataFrame, or None if the game is not cached.
+    """
+    path = cache_path(key, cache_dir)
+    if not os.path.exists(path):
+        return None
+    # Touch the file so eviction sees it as recently used
+    os.utime(path)
+    # One block per column, so columns Arrow can hand over without copying
+    # (the categorical codes) stay backed by the memory-mapped file
+    return feather.read_table(path, memory_map=True).to_pandas(split_blocks=True)
+
+
+def write_cached(key, df, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """
+    Stores a preprocessed game in the cache and evicts old entries.
+
+    Args:
+    key: str. The content hash of the raw file.
+    df: DataFrame. The preprocessed plays.
+    cache_dir: str. The cache directory.
+    max_bytes: int. The size the cache is trimmed back to.
+
+    Returns:
+    None.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = cache_path(key, cache_dir)
+    # Write to a temporary file first so readers never see a partial file
+    tmp_path = path + '.tmp'
+    # Uncompressed and in a single record batch, so a memory-mapped read
+    # hands out the file's own pages instead of decompressing or
+    # concatenating the columns into memory
+    df.reset_index(drop=True).to_feather(tmp_path, compression='uncompressed', chunksize=max(len(df), 1))
+    os.replace(tmp_path, path)
+    evict(cache_dir, max_bytes, keep=path)
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, keep=None):
+    """
+    Deletes the least recently used cache files until the cache fits.
+
+    Args:
+    cache_dir: str. The cache directory.
+    max_bytes: int. The maximum total size of the cache.
+    keep: str. A path that is never evicted, such as the file just written.
+
+    Returns:
+    list of str. The paths that were deleted.
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.feather'):
+            path = os.path.join(cache_dir, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    evicted = []
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        os.remove(path)
+        total -= size
+        evicted.append(path)
+    return evicted
+
+
+def load_preprocessed(raw_bytes, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, key=None):
+    """
+    Returns the preprocessed plays for a raw game file in the play schema,
+    parsing it only if the same contents have not been seen before.
+
+    Args:
+    raw_bytes: bytes. The contents of the raw game CSV.
+    cache_dir: str. The cache directory.
+    max_bytes: int. The maximum total size of the cache.
+    key: str. The content hash, if the caller has already computed it.
+
+    Returns:
+    DataFrame. The typed preprocessed plays.
+    """
+    if key is None:
+        with stage('cache.hash'):
+            key = content_hash(raw_bytes)
+    with stage('cache.read') as s:
+        df = read_cached(key, cache_dir)
+        s.rows = None if df is None else len(df)
+    if df is None:
+        with stage('cache.parse') as s:
+            df = apply_schema(preprocess_frame(pd.read_csv(io.BytesIO(raw_bytes))))
+            s.rows = len(df)
+        with stage('cache.write', len(df)):
+            write_cached(key, df, cache_dir, max_bytes)
+        # Hand back the memory-mapped copy, as a later cache hit would
+        df = read_cached(key, cache_dir)
+    return df
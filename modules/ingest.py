@@ -0,0 +1,131 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from modules.data_preprocessing import preprocess_frame
+from modules import warehouse
+from modules.drives import compute_drives
+
+
+def is_raw_game(path):
+    """
+    Checks whether a CSV file is a raw two-column play-by-play export.
+
+    Args:
+    path: str. The path to the CSV file.
+
+    Returns:
+    bool.
+    """
+    try:
+        header = pd.read_csv(path, nrows=0)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError):
+        return False
+    return len(header.columns) == 2
+
+
+def discover_games(directory):
+    """
+    Finds every raw game CSV in a directory.
+
+    Files written by the app ('preprocessed_*') and files that are not
+    two-column play-by-play are skipped.
+
+    Args:
+    directory: str. The directory to search.
+
+    Returns:
+    list of str. The paths of the raw game files, sorted by name.
+    """
+    paths = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not name.lower().endswith('.csv') or name.startswith('preprocessed_'):
+            continue
+        if os.path.isfile(path) and is_raw_game(path):
+            paths.append(path)
+    return paths
+
+
+def game_id_for(path):
+    """
+    Returns the game id for a raw game file, which is its file name without
+    the extension.
+    """
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def ingest_game(path):
+    """
+    Preprocesses one raw game file and tags its plays with the game id.
+
+    Args:
+    path: str. The path to the raw game file.
+
+    Returns:
+    DataFrame. The preprocessed plays with a leading 'game_id' column.
+    """
+    df = preprocess_frame(pd.read_csv(path))
+    df.insert(0, 'game_id', game_id_for(path))
+    return df
+
+
+def ingest_games(paths, workers=None):
+    """
+    Preprocesses several raw game files across a process pool.
+
+    Args:
+    paths: list of str. The raw game files.
+    workers: int. The number of worker processes. Defaults to the CPU count.
+
+    Returns:
+    DataFrame. The plays of every game, in the order of paths.
+    """
+    if not paths:
+        return pd.DataFrame()
+
+    if workers == 1 or len(paths) == 1:
+        games = [ingest_game(path) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            games = list(pool.map(ingest_game, paths))
+
+    return pd.concat(games, ignore_index=True)
+
+
+def drives_path_for(output_path):
+    """
+    Returns the drives CSV written next to a season CSV.
+    """
+    root, ext = os.path.splitext(output_path)
+    return f"{root}_drives{ext or '.csv'}"
+
+
+def ingest_directory(directory, output_path, workers=None, warehouse_path=None, season_name=None, drives_path=None):
+    """
+    Preprocesses every raw game in a directory into one season file, and
+    summarises its drives into a second file with one row per drive.
+
+    Args:
+    directory: str. The directory holding the raw game files.
+    output_path: str. The path of the season CSV to write.
+    workers: int. The number of worker processes.
+    warehouse_path: str. A SQLite warehouse to also load the games into.
+    season_name: str. The season recorded for the games in the warehouse.
+    drives_path: str. The drives CSV to write. Defaults to the season CSV
+    name with a '_drives' suffix.
+
+    Returns:
+    DataFrame. The merged season dataset.
+    """
+    paths = discover_games(directory)
+    season = ingest_games(paths, workers)
+    season.to_csv(output_path, index=False)
+    if len(season):
+        compute_drives(season).to_csv(drives_path or drives_path_for(output_path))
+    if warehouse_path is not None and len(season):
+        conn = warehouse.connect(warehouse_path)
+        try:
+            warehouse.insert_season(conn, season, season_name)
+        finally:
+            conn.close()
+    return season
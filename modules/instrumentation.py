@@ -0,0 +1,160 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger('footie.stages')
+
+# Set FOOTIE_INSTRUMENT=1 to record stages. When it is off, stage() hands
+# back one shared object whose methods do nothing, so instrumented code
+# pays for a function call and nothing else.
+_enabled = os.environ.get('FOOTIE_INSTRUMENT', '') not in ('', '0')
+
+# Records are kept per thread, and Streamlit runs each session's script on
+# its own thread, so every request sees only its own stages
+_local = threading.local()
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def enable(flag=True):
+    """
+    Turns stage recording on or off for the whole process.
+    """
+    global _enabled
+    _enabled = flag
+
+
+def is_enabled():
+    return _enabled
+
+
+def configure_logging(stream=None):
+    """
+    Sends stage records to stderr (or stream) as one JSON object per line,
+    unless the logger already has a handler.
+    """
+    if not logger.handlers:
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+def current_rss():
+    """
+    Returns the resident memory of this process in bytes, or None where
+    /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def start_request():
+    """
+    Clears the stages recorded so far on this thread. Call it at the start
+    of each request or script run.
+    """
+    _local.records = []
+    _local.depth = 0
+
+
+def records():
+    """
+    Returns the stages recorded on this thread since start_request, in the
+    order they finished.
+    """
+    return list(getattr(_local, 'records', []))
+
+
+class _NullStage:
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self.depth = getattr(_local, 'depth', 0)
+        _local.depth = self.depth + 1
+        self.rss = current_rss()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        _local.depth = self.depth
+        rss = current_rss()
+        record = {
+            'stage': self.name,
+            'seconds': round(seconds, 6),
+            'rows': self.rows,
+            'memory_delta': None if rss is None or self.rss is None else rss - self.rss,
+            'depth': self.depth,
+            'error': None if exc_type is None else exc_type.__name__,
+        }
+        if not hasattr(_local, 'records'):
+            _local.records = []
+        _local.records.append(record)
+        logger.info(json.dumps(record))
+        return False
+
+
+def stage(name, rows=None):
+    """
+    Times a block of code as a named stage.
+
+    Set 'rows' on the returned object inside the block to record how many
+    rows the stage produced:
+
+        with stage('preprocess.classify') as s:
+            labels = play_classifier.classify(df['two'])
+            s.rows = len(labels)
+
+    Args:
+    name: str. The stage name, dotted by area, e.g. 'stats.down'.
+    rows: int. The row count, if already known.
+
+    Returns:
+    A context manager.
+    """
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name, rows)
+
+
+def instrumented(name):
+    """
+    Decorates a function so each call is recorded as a stage. The row
+    count is the length of the return value, when it has one.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Stage(name) as s:
+                result = fn(*args, **kwargs)
+                try:
+                    s.rows = len(result)
+                except TypeError:
+                    pass
+                return result
+        return wrapper
+    return decorator
@@ -0,0 +1,183 @@
+import re
+import numpy as np
+import pandas as pd
+
+# Keywords searched for (case-insensitively) in the play description and the
+# label they map to. For play types the first rule that matches wins.
+PLAYTYPE_RULES = [('Pass', 'Pass'),
+                  ('Rush', 'Rush'),
+                  ('Sacked', 'Pass'),
+                  ('Sack', 'Pass'),
+                  ('Field Goal', 'Field Goal'),
+                  ('Punt', 'Punt'),
+                  ('Kick Attempt', 'Kick Attempt'),
+                  ('Penalty', 'Penalty'),
+                  ('Kickoff', 'Kickoff')]
+
+# For outcomes the last rule that matches wins, so later rules take priority
+OUTCOME_RULES = [('Touchdown', 'Touchdown'),
+                 ('Penalty', 'Penalty'),
+                 ('Interception', 'Interception'),
+                 ('Intercepted', 'Interception'),
+                 ('Fumble', 'Fumble'),
+                 ('Fumbled', 'Fumble'),
+                 ('1st Down', '1st Down'),
+                 ('Kick Attempt Good', 'Kick Attempt Good'),
+                 ('Kick Attempt Failed', 'Kick Attempt Failed'),
+                 ('Touchback', 'Touchback'),
+                 ('Sack', 'Sack'),
+                 ('Sacked', 'Sack'),
+                 ('Blocked', 'Blocked'),
+                 ('No Play', 'No Play'),
+                 ('Incomplete', 'Incomplete')]
+
+# Situations that sit alongside a play's type and outcome rather than
+# replacing them, e.g. an incomplete two-point pass or a fumbled onside
+# kick. The first rule that matches wins.
+SPECIAL_RULES = [('Safety', 'Safety'),
+                 ('Two-Point', 'Two-Point Attempt'),
+                 ('Onside', 'Onside Kick')]
+
+YARDS_PATTERN = re.compile(r'for (no gain|loss of (\d+) yard(s)?|(\d+) yard(s)?)', re.IGNORECASE)
+
+# Field goals are only marked good in the play text, e.g. "attempt from 35 GOOD"
+FIELD_GOAL_GOOD_PATTERN = re.compile(r'\bgood\b', re.IGNORECASE)
+
+
+class KeywordClassifier:
+    """
+    Labels text against any number of keyword rule tables in one regex pass.
+
+    Every keyword of every table is compiled into a single alternation that
+    reports each position where a keyword starts. A match on a keyword also
+    counts as a match on every shorter keyword it contains (e.g. 'Sacked'
+    implies 'Sack'), so the result is the same as searching each keyword
+    separately.
+
+    Each table has a policy: 'first' labels a row with the earliest rule in
+    the table that matches, 'last' with the latest one.
+    """
+
+    def __init__(self):
+        self.tables = {}
+        self._compiled = None
+
+    def add_rules(self, name, rules, policy='first'):
+        """
+        Adds rules to a table, creating the table if needed.
+
+        Args:
+        name: str. The table name, used as the output column name.
+        rules: list of (keyword, label). Appended after any existing rules.
+        policy: str. 'first' or 'last'. Only used when creating the table.
+
+        Returns:
+        None.
+        """
+        if policy not in ('first', 'last'):
+            raise ValueError(f"Unknown policy: {policy}")
+        table = self.tables.setdefault(name, {'rules': [], 'policy': policy})
+        table['rules'].extend(rules)
+        self._compiled = None
+
+    def compile(self):
+        """
+        Builds the combined pattern and the per-table keyword lookups.
+
+        Returns:
+        tuple. The compiled pattern and a dict of table name to a dict of
+        matched keyword to winning rule index.
+        """
+        if self._compiled is not None:
+            return self._compiled
+
+        keywords = {keyword.lower() for table in self.tables.values() for keyword, _ in table['rules']}
+        # Longest first so each position reports the longest keyword starting there
+        ordered = sorted(keywords, key=len, reverse=True)
+        pattern = re.compile('(?=(' + '|'.join(re.escape(k) for k in ordered) + '))', re.IGNORECASE)
+
+        lookups = {}
+        for name, table in self.tables.items():
+            pick = min if table['policy'] == 'first' else max
+            lookup = {}
+            for keyword in keywords:
+                hits = [i for i, (rule, _) in enumerate(table['rules']) if rule.lower() in keyword]
+                if hits:
+                    lookup[keyword] = pick(hits)
+            lookups[name] = lookup
+
+        self._compiled = (pattern, lookups)
+        return self._compiled
+
+    def classify(self, text):
+        """
+        Labels every row of a text column.
+
+        Args:
+        text: Series. The text to classify. Non-string values get NaN.
+
+        Returns:
+        DataFrame. One column per table, indexed like text.
+        """
+        pattern, lookups = self.compile()
+
+        is_str = text.map(lambda x: isinstance(x, str)).to_numpy(dtype=bool)
+        strings = text[is_str].astype(str)
+        result = pd.DataFrame(index=text.index)
+
+        if len(strings):
+            matches = strings.str.extractall(pattern)[0].str.lower()
+        else:
+            matches = pd.Series(dtype=object)
+
+        for name, table in self.tables.items():
+            rule_index = matches.map(lookups[name]).dropna()
+            grouped = rule_index.groupby(level=0)
+            best = grouped.min() if table['policy'] == 'first' else grouped.max()
+            labels = np.array([label for _, label in table['rules']], dtype=object)
+            column = pd.Series(np.nan, index=text.index, dtype=object)
+            column.loc[best.index] = labels[best.to_numpy(dtype=int)]
+            result[name] = column
+
+        return result
+
+
+def extract_yards(text):
+    """
+    Extracts the yards gained from play descriptions.
+
+    'for no gain' is 0, 'for loss of N yards' is -N and 'for N yards' is N.
+
+    Args:
+    text: Series. The play descriptions.
+
+    Returns:
+    Series of numbers, NaN where no yardage is given.
+    """
+    parts = text.str.extract(YARDS_PATTERN)
+    yards = parts[3].where(parts[3].notna(), '-' + parts[1])
+    yards = yards.where(parts[0] != 'no gain', '0')
+    return pd.to_numeric(yards)
+
+
+def field_goal_made(playtype, text):
+    """
+    Flags the field goal attempts that were good.
+
+    Args:
+    playtype: Series. The play types from classify.
+    text: Series. The play descriptions.
+
+    Returns:
+    Series of bool.
+    """
+    field_goal = (playtype == 'Field Goal').to_numpy(dtype=bool, na_value=False)
+    made = pd.Series(False, index=text.index)
+    made[field_goal] = text[field_goal].astype(str).str.contains(FIELD_GOAL_GOOD_PATTERN).to_numpy()
+    return made
+
+
+play_classifier = KeywordClassifier()
+play_classifier.add_rules('playtype', PLAYTYPE_RULES, policy='first')
+play_classifier.add_rules('outcome', OUTCOME_RULES, policy='last')
+play_classifier.add_rules('special', SPECIAL_RULES, policy='first')
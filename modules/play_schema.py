@@ -0,0 +1,120 @@
+import os
+import pandas as pd
+from pyarrow import feather, ipc
+from modules.data_preprocessing import DERIVED_COLUMNS, derive_columns
+
+# Enumerated columns are stored as categorical codes and numeric columns as
+# the smallest nullable integer that holds them, so NaN no longer forces
+# float64 and repeated strings are stored once per category.
+PLAY_SCHEMA = {
+    'game_id': 'category',
+    'half': 'Int8',
+    'quarter': 'Int8',
+    'poss': 'category',
+    'down': 'category',
+    'to_go': 'category',
+    'playtype': 'category',
+    'yards': 'Int16',
+    'outcome': 'category',
+    'ball_half': 'category',
+    'yardline': 'Int16',
+    'drive': 'Int32',
+    'field_position': 'Int16',
+    'special': 'category',
+    'field_goal_made': 'boolean',
+}
+
+# The raw play text is only needed for checking the parser, so it can be
+# left on disk and loaded on demand with load_text
+TEXT_COLUMNS = ['one', 'two']
+
+
+def apply_schema(df, include_text=True):
+    """
+    Converts a preprocessed frame to the compact play schema.
+
+    Args:
+    df: DataFrame. The preprocessed plays. Not modified.
+    include_text: bool. Whether to keep the raw 'one' and 'two' columns.
+
+    Returns:
+    DataFrame. A typed copy of df.
+    """
+    columns = [c for c in df.columns if include_text or c not in TEXT_COLUMNS]
+    typed = df[columns].copy()
+    for column, dtype in PLAY_SCHEMA.items():
+        if column not in typed.columns:
+            continue
+        if dtype == 'category':
+            typed[column] = typed[column].astype('category')
+        else:
+            typed[column] = pd.to_numeric(typed[column], errors='coerce').round().astype(dtype)
+    return typed
+
+
+def read_columns(path, columns=None):
+    """
+    Reads some or all columns of a preprocessed CSV or Feather file.
+    """
+    if os.path.splitext(path)[1].lower() == '.feather':
+        if columns is not None:
+            # Feather refuses unknown columns, so only ask for the ones the file has
+            names = ipc.open_file(path).schema.names
+            columns = [c for c in columns if c in names]
+        return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+    usecols = None if columns is None else (lambda c: c in columns)
+    return pd.read_csv(path, usecols=usecols)
+
+
+def load_plays(path, include_text=False):
+    """
+    Loads a preprocessed game or season file with the compact play schema.
+
+    Files without the DERIVED_COLUMNS of preprocess_frame, such as those
+    written by preprocess_data, get them from the play text.
+
+    Args:
+    path: str. A preprocessed CSV or Feather file.
+    include_text: bool. Whether to load the raw 'one' and 'two' columns.
+
+    Returns:
+    DataFrame.
+    """
+    columns = None if include_text else list(PLAY_SCHEMA)
+    df = read_columns(path, columns)
+    missing = [column for column in DERIVED_COLUMNS if column not in df.columns]
+    if missing:
+        # Files from preprocess_data keep the original layout, without these
+        plays = df if include_text else df.join(read_columns(path, TEXT_COLUMNS))
+        df[missing] = derive_columns(plays)[missing]
+    return apply_schema(df, include_text)
+
+
+def load_text(path, index=None):
+    """
+    Loads the raw 'one' and 'two' columns that load_plays left on disk.
+
+    Args:
+    path: str. The file load_plays read.
+    index: Index. Rows to return, e.g. the index of a filtered frame.
+
+    Returns:
+    DataFrame with columns 'one' and 'two'.
+    """
+    text = read_columns(path, TEXT_COLUMNS)
+    return text if index is None else text.loc[index]
+
+
+def memory_usage(df):
+    """
+    Reports the memory used by each column, counting string contents.
+
+    Args:
+    df: DataFrame.
+
+    Returns:
+    Series of bytes per column, with a 'total' entry.
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    usage['total'] = usage.sum()
+    return usage
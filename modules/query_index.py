@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+# Columns filtered by value in the sidebar
+INDEXED_COLUMNS = ['poss', 'down', 'playtype']
+
+
+class ColumnIndex:
+    """
+    Row positions for each distinct value of one column.
+
+    Values are factorized into integer codes once. Rows are sorted by code,
+    so the positions of every value are a contiguous, ascending slice of
+    the sorted order. NaN gets its own slice, so 'isin' selections that
+    include NaN behave like Series.isin.
+    """
+
+    def __init__(self, values):
+        codes, uniques = pd.factorize(values)
+        # Shift so NaN (-1) becomes code 0 and can be indexed like any other value
+        self.codes = codes + 1
+        self.value_codes = {value: code + 1 for code, value in enumerate(uniques)}
+        self.order = np.argsort(self.codes, kind='stable')
+        counts = np.bincount(self.codes, minlength=len(uniques) + 1)
+        self.starts = np.concatenate([[0], np.cumsum(counts)])
+
+    def code_for(self, value):
+        if pd.isna(value):
+            return 0
+        return self.value_codes.get(value)
+
+    def codes_for(self, values, match_na=True):
+        codes = [self.code_for(value) for value in values]
+        return [code for code in codes if code is not None and (match_na or code != 0)]
+
+    def positions(self, codes):
+        """
+        Returns the sorted row positions holding any of the given codes.
+        """
+        slices = [self.order[self.starts[code]:self.starts[code + 1]] for code in codes]
+        if not slices:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate(slices)) if len(slices) > 1 else slices[0]
+
+    def count(self, codes):
+        return sum(int(self.starts[code + 1] - self.starts[code]) for code in codes)
+
+    def allowed(self, codes):
+        """
+        Returns a lookup table that is True for the given codes.
+        """
+        table = np.zeros(len(self.starts) - 1, dtype=bool)
+        table[codes] = True
+        return table
+
+
+class PlayIndex:
+    """
+    A query index over the preprocessed plays, built once per dataset.
+
+    Holds a ColumnIndex for each of INDEXED_COLUMNS and the yards values
+    in sorted order, so a yards range is two binary searches. A query
+    starts from whichever selection matches the fewest rows and checks the
+    remaining selections only on those rows.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.columns = {column: ColumnIndex(data[column]) for column in INDEXED_COLUMNS}
+
+        self.yards = data['yards'].to_numpy(dtype=float, na_value=np.nan)
+        valid = np.flatnonzero(~np.isnan(self.yards))
+        order = np.argsort(self.yards[valid], kind='stable')
+        self.yards_positions = valid[order]
+        self.yards_sorted = self.yards[self.yards_positions]
+
+    def yards_slice(self, low, high):
+        start = np.searchsorted(self.yards_sorted, low, side='left')
+        stop = np.searchsorted(self.yards_sorted, high, side='right')
+        return start, max(start, stop)
+
+    def positions(self, selected_teams, selected_downs, selected_playtypes, selected_yards_range):
+        """
+        Returns the sorted row positions matching every selection.
+
+        Args:
+        selected_teams: list. Values of 'poss' to keep.
+        selected_downs: object. The value of 'down' to keep.
+        selected_playtypes: list. Values of 'playtype' to keep.
+        selected_yards_range: tuple. Inclusive (min, max) yards.
+
+        Returns:
+        ndarray of int.
+        """
+        selections = {
+            'poss': self.columns['poss'].codes_for(selected_teams),
+            # Equality never matches NaN
+            'down': self.columns['down'].codes_for([selected_downs], match_na=False),
+            'playtype': self.columns['playtype'].codes_for(selected_playtypes),
+        }
+        low, high = selected_yards_range
+        start, stop = self.yards_slice(low, high)
+
+        sizes = {column: self.columns[column].count(codes) for column, codes in selections.items()}
+        driver = min(sizes, key=sizes.get)
+        if stop - start < sizes[driver]:
+            candidates = np.sort(self.yards_positions[start:stop])
+            driver = 'yards'
+        else:
+            candidates = self.columns[driver].positions(selections[driver])
+
+        keep = np.ones(len(candidates), dtype=bool)
+        for column, codes in selections.items():
+            if column != driver:
+                index = self.columns[column]
+                keep &= index.allowed(codes)[index.codes[candidates]]
+        if driver != 'yards':
+            yards = self.yards[candidates]
+            keep &= (yards >= low) & (yards <= high)
+
+        return candidates[keep]
+
+    def query(self, selected_teams, selected_downs, selected_playtypes, selected_yards_range):
+        """
+        Returns the rows matching every selection, in their original order.
+        """
+        positions = self.positions(selected_teams, selected_downs, selected_playtypes, selected_yards_range)
+        return self.data.iloc[positions]
@@ -0,0 +1,242 @@
+import csv
+import random
+
+# Team names used for generated games. Abbreviations in the play text are
+# the names in capitals without spaces, as in real exports (AVEMARIA49).
+TEAMS = ['Ave Maria', 'Madonna', 'Keiser', 'Warner', 'Webber', 'Southeastern',
+         'Florida Memorial', 'Edward Waters', 'Point', 'Reinhardt', 'Union', 'Kentucky Christian']
+
+FIRST_NAMES = ['A.', 'B.', 'C.', 'D.', 'E.', 'J.', 'K.', 'M.', 'N.', 'Q.', 'R.', 'T.']
+LAST_NAMES = ['Marks', 'Jenkins', 'Mauricette', 'Brantley', 'Allgood', 'Summers', 'Newkirk',
+              'Stoyanovich', 'West', "O'Neil", 'Cobb', 'Ware', 'Sands', 'Galasso', 'Davis']
+
+# The number of plays in each quarter of a generated game
+PLAYS_PER_QUARTER = 40
+
+QUARTER_MARKERS = {1: 'Start of 1st Half', 2: 'Start of Quarter #2',
+                   3: 'Start of 2nd Half', 4: 'Start of Quarter #4'}
+
+
+def abbreviation(team):
+    return team.upper().replace(' ', '')
+
+
+class GameGenerator:
+    """
+    Generates the raw two-column play-by-play of one game.
+
+    A simple drive simulation moves the ball with rushes, passes, sacks,
+    penalties, punts, field goals, turnovers and touchdowns, and writes the
+    rows a real export contains: half and quarter markers, "Team at MM:SS"
+    possession lines, drive start and drive total rows, and
+    down-and-distance rows with their play descriptions.
+    """
+
+    def __init__(self, home, away, rng):
+        self.teams = [home, away]
+        self.rng = rng
+        self.rows = []
+        self.clock = 15 * 60
+
+    def player(self):
+        return f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+
+    def clock_text(self):
+        return f"{self.clock // 60:02d}:{self.clock % 60:02d}"
+
+    def spot(self, offense, position):
+        # position is yards from the offense's own goal line
+        own, opp = (abbreviation(t) for t in self.ordered(offense))
+        if position <= 50:
+            return f"{own}{position:02d}"
+        return f"{opp}{100 - position:02d}"
+
+    def ordered(self, offense):
+        return (offense, self.teams[1] if offense == self.teams[0] else self.teams[0])
+
+    def gain_text(self, yards):
+        if yards == 0:
+            return "for no gain"
+        if yards < 0:
+            return f"for loss of {-yards} yard{'s' if yards != -1 else ''}"
+        return f"for {yards} yard{'s' if yards != 1 else ''}"
+
+    def possession(self, team):
+        self.rows.append([f"{team} at {self.clock_text()}", f"{team} drive start at {self.clock_text()}."])
+
+    def drive_totals(self, team, plays, yards):
+        self.rows.append([f"{team} drive totals", f"Total {plays} plays, {yards} yards"])
+
+    def kickoff(self, kicking, situation):
+        receiving = self.ordered(kicking)[1]
+        length = self.rng.randint(45, 70)
+        # Kickoffs are from the kicking team's 35
+        landing = 65 - length
+        if landing <= 0 or self.rng.random() < 0.3:
+            text = f"{self.player()} kickoff {length} yards to the {abbreviation(receiving)}{max(0, landing)}, touchback."
+            start = 25
+        else:
+            ret = self.rng.randint(10, 40)
+            start = min(60, landing + ret)
+            text = (f"{self.player()} kickoff {length} yards to the {abbreviation(receiving)}{landing}, "
+                    f"{self.player()} return {ret} yards to the {self.spot(receiving, start)} ({self.player()}).")
+        self.rows.append([situation, text])
+        return receiving, start
+
+    def drive(self, offense, position, quarter_end):
+        """
+        Simulates one drive. Returns the team that kicks off next (after a
+        score) or None, the team in possession next, and its position.
+        """
+        self.possession(offense)
+        defense = self.ordered(offense)[1]
+        abbr = abbreviation(offense)
+        down, to_go, plays, gained = 1, 10, 0, 0
+
+        while len(self.rows) < quarter_end:
+            goal = position + to_go >= 100
+            situation = f"{['1st', '2nd', '3rd', '4th'][down - 1]} and {'GOAL' if goal else to_go} at {self.spot(offense, position)}"
+            self.clock = max(0, self.clock - self.rng.randint(15, 45))
+            plays += 1
+
+            if down == 4:
+                if position >= 62:
+                    distance = 100 - position + 17
+                    good = self.rng.random() < 0.7
+                    self.rows.append([situation, f"{self.player()} field goal attempt from {distance} {'GOOD' if good else 'MISSED'}, clock {self.clock_text()}."])
+                    self.drive_totals(offense, plays, gained)
+                    return (offense if good else None), defense, 100 - position
+                length = self.rng.randint(30, 50)
+                self.rows.append([situation, f"{self.player()} punt {length} yards to the {self.spot(offense, min(99, position + length))}, fair catch by {self.player()}."])
+                self.drive_totals(offense, plays, gained)
+                return None, defense, max(1, 100 - min(99, position + length))
+
+            roll = self.rng.random()
+            if roll < 0.05:
+                self.rows.append([situation, f"Timeout {defense}, clock {self.clock_text()}."])
+                plays -= 1
+                continue
+            if roll < 0.10:
+                yards = -5 if self.rng.random() < 0.5 else 5
+                self.rows.append([situation, f"PENALTY {abbr if yards < 0 else abbreviation(defense)} false start {abs(yards)} yards to the {self.spot(offense, position + yards)}."])
+                position = min(99, max(1, position + yards))
+                to_go -= yards
+                if to_go <= 0:
+                    down, to_go = 1, min(10, 100 - position)
+                continue
+            if roll < 0.13:
+                self.rows.append([situation, f"{self.player()} pass intercepted by {self.player()} at the {self.spot(offense, position + 15)}, {self.player()} return 5 yards."])
+                self.drive_totals(offense, plays, gained)
+                return None, defense, max(1, min(99, 100 - position - 10))
+
+            if roll < 0.55:
+                yards = max(-3, int(self.rng.gauss(4, 5)))
+                text = f"{self.player()} rush"
+            elif roll < 0.62:
+                yards = -self.rng.randint(2, 9)
+                text = f"{self.player()} sacked"
+            elif roll < 0.80:
+                yards = max(0, int(self.rng.expovariate(1 / 11)))
+                text = f"{self.player()} pass complete to {self.player()}"
+            else:
+                self.rows.append([situation, f"{self.player()} pass incomplete to {self.player()}."])
+                down += 1
+                continue
+
+            # No gain goes past the goal line, so describe the gain once it is clamped
+            yards = min(yards, 100 - position)
+            text += f" {self.gain_text(yards)}"
+            position += yards
+            gained += yards
+            if position >= 100:
+                self.rows.append([situation, f"{text} to the {abbreviation(defense)}0, TOUCHDOWN, clock {self.clock_text()}."])
+                self.rows.append([f"1st and GOAL at {abbreviation(defense)}03", f"{self.player()} kick attempt {'good' if self.rng.random() < 0.9 else 'failed'}."])
+                self.drive_totals(offense, plays, gained)
+                return offense, defense, None
+            if position <= 0:
+                position = 1
+            if yards >= to_go:
+                text += f" to the {self.spot(offense, position)}, 1ST DOWN {abbr} ({self.player()})."
+                down, to_go = 1, min(10, 100 - position)
+            else:
+                text += f" to the {self.spot(offense, position)} ({self.player()})."
+                down, to_go = down + 1, to_go - yards
+            if self.rng.random() < 0.01:
+                text = text.rstrip('.') + f", fumble by {self.player()} recovered by {abbreviation(defense)} {self.player()}."
+                self.rows.append([situation, text])
+                self.drive_totals(offense, plays, gained)
+                return None, defense, max(1, 100 - position)
+            self.rows.append([situation, text])
+
+        self.drive_totals(offense, plays, gained)
+        return None, None, position
+
+    def generate(self):
+        """
+        Returns the rows of the whole game.
+        """
+        kicking = self.teams[1]
+        offense, position = None, None
+        for quarter in range(1, 5):
+            self.rows.append([QUARTER_MARKERS[quarter], None])
+            self.clock = 15 * 60
+            quarter_end = len(self.rows) + PLAYS_PER_QUARTER
+            if quarter == 3:
+                kicking, offense = self.teams[0], None
+            while len(self.rows) < quarter_end:
+                if offense is None:
+                    self.possession(kicking)
+                    offense, position = self.kickoff(kicking, f"1st and 10 at {abbreviation(kicking)}35")
+                scorer, next_offense, next_position = self.drive(offense, position, quarter_end)
+                if scorer is not None:
+                    kicking, offense = scorer, None
+                elif next_offense is not None:
+                    offense, position = next_offense, next_position
+                else:
+                    position = next_position
+        return self.rows
+
+
+def generate_rows(plays, teams=TEAMS, seed=0):
+    """
+    Yields raw rows of generated games until at least the given number of
+    rows has been produced.
+
+    Args:
+    plays: int. The minimum number of rows to generate.
+    teams: list of str. The teams that play each other.
+    seed: int. The random seed, so runs are reproducible.
+
+    Yields:
+    list of [one, two].
+    """
+    rng = random.Random(seed)
+    produced = 0
+    while produced < plays:
+        home, away = rng.sample(teams, 2)
+        rows = GameGenerator(home, away, rng).generate()
+        produced += len(rows)
+        yield from rows
+
+
+def write_raw(path, plays, teams=TEAMS, seed=0):
+    """
+    Writes a raw play-by-play CSV of generated games.
+
+    Games are written as they are generated, so memory use does not depend
+    on the number of plays.
+
+    Args:
+    path: str. The CSV file to write.
+    plays: int. The minimum number of rows to generate.
+    teams: list of str. The teams that play each other.
+    seed: int. The random seed.
+
+    Returns:
+    None.
+    """
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Situation', 'Play'])
+        for row in generate_rows(plays, teams, seed):
+            writer.writerow(row)
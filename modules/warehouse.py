@@ -0,0 +1,356 @@
+import sqlite3
+from itertools import islice
+import pandas as pd
+from modules.data_processing import COUNT_METRICS, YARD_METRICS, assemble_stats_table
+from modules.drives import DRIVE_COLUMNS, compute_drives
+from modules.play_classifier import field_goal_made
+
+WAREHOUSE_PATH = './data/warehouse.sqlite'
+
+# Rows sent to SQLite per executemany call
+INSERT_BATCH_SIZE = 5000
+
+# Stored in the database's user_version. Bump it whenever SCHEMA, or how stored
+# rows are derived, changes and add a step to MIGRATIONS that brings an
+# existing warehouse up to it.
+SCHEMA_VERSION = 4
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS games (
+    game_id TEXT PRIMARY KEY,
+    season TEXT
+);
+
+CREATE TABLE IF NOT EXISTS plays (
+    game_id TEXT NOT NULL REFERENCES games (game_id),
+    drive INTEGER NOT NULL,
+    play_no INTEGER NOT NULL,
+    half INTEGER,
+    quarter INTEGER,
+    poss TEXT COLLATE NOCASE,
+    down TEXT,
+    to_go TEXT,
+    to_go_num REAL,
+    playtype TEXT COLLATE NOCASE,
+    yards INTEGER,
+    outcome TEXT COLLATE NOCASE,
+    ball_half TEXT COLLATE NOCASE,
+    yardline INTEGER,
+    one TEXT,
+    two TEXT,
+    field_goal_made INTEGER,
+    PRIMARY KEY (game_id, drive, play_no)
+);
+
+CREATE INDEX IF NOT EXISTS plays_poss ON plays (poss);
+CREATE INDEX IF NOT EXISTS plays_down ON plays (down);
+CREATE INDEX IF NOT EXISTS plays_playtype ON plays (playtype);
+CREATE INDEX IF NOT EXISTS plays_yardline ON plays (yardline);
+CREATE INDEX IF NOT EXISTS plays_field_goal_made ON plays (field_goal_made);
+
+CREATE TABLE IF NOT EXISTS drives (
+    game_id TEXT NOT NULL REFERENCES games (game_id),
+    drive INTEGER NOT NULL,
+    team TEXT COLLATE NOCASE,
+    quarter INTEGER,
+    start_position REAL,
+    end_position REAL,
+    plays INTEGER,
+    yards INTEGER,
+    first_downs INTEGER,
+    red_zone INTEGER,
+    result TEXT,
+    points INTEGER,
+    PRIMARY KEY (game_id, drive)
+);
+
+CREATE INDEX IF NOT EXISTS drives_team ON drives (team);
+'''
+
+PLAY_COLUMNS = ['game_id', 'drive', 'play_no', 'half', 'quarter', 'poss', 'down', 'to_go', 'to_go_num',
+                'playtype', 'yards', 'outcome', 'ball_half', 'yardline', 'one', 'two', 'field_goal_made']
+
+# Per-(team, down) aggregates matching compute_stats_table. Text columns
+# compare case-insensitively through their NOCASE collation.
+STATS_BY_DOWN_SQL = '''
+SELECT lower(poss) AS team,
+       down,
+       COUNT(*) AS plays,
+       SUM(playtype = 'pass') AS pass_plays,
+       SUM(playtype = 'rush') AS rush_plays,
+       SUM(outcome IN ('touchdown', 'field goal')) AS scores,
+       SUM(down = '1st') AS first_down_plays,
+       SUM(playtype = 'rush' AND ball_half = 'opponents' AND yardline <= 20) AS redzone_rushes,
+       SUM(playtype = 'pass' AND ball_half = 'opponents' AND yardline <= 20) AS redzone_passes,
+       SUM(playtype = 'pass' AND to_go_num < 5) AS passes_under_5_to_go,
+       SUM(playtype = 'rush' AND to_go_num > 5) AS runs_over_5_to_go,
+       SUM(yards >= :explosive) AS explosive_plays,
+       SUM(yards >= :explosive AND playtype = 'pass') AS explosive_passes,
+       SUM(yards >= :explosive AND playtype = 'rush') AS explosive_rushes,
+       SUM(yards >= :explosive AND outcome = 'touchdown') AS explosive_tds,
+       SUM(yards) AS yards,
+       SUM(CASE WHEN playtype = 'pass' THEN yards END) AS pass_yards,
+       SUM(CASE WHEN playtype = 'rush' THEN yards END) AS rush_yards,
+       SUM(CASE WHEN yards >= :explosive THEN yards END) AS explosive_yards
+FROM plays
+WHERE poss IS NOT NULL {games}
+GROUP BY lower(poss), down
+'''
+
+DRIVES_SQL = '''
+SELECT team, COUNT(*) AS drives, AVG(drive_yards) AS yards_per_drive
+FROM (SELECT lower(poss) AS team, COALESCE(SUM(yards), 0) AS drive_yards
+      FROM plays
+      WHERE poss IS NOT NULL {games}
+      GROUP BY lower(poss), game_id, drive)
+GROUP BY team
+'''
+
+# The first spelling of each team, ordered by first appearance
+TEAM_NAMES_SQL = '''
+SELECT lower(poss) AS team, poss AS team_name
+FROM plays
+WHERE rowid IN (SELECT MIN(rowid) FROM plays WHERE poss IS NOT NULL {games} GROUP BY lower(poss))
+ORDER BY rowid
+'''
+
+
+def recompute_drives(conn):
+    """
+    Rebuilds every game's drives from its stored plays.
+    """
+    conn.executescript(SCHEMA)
+    conn.execute("DELETE FROM drives")
+    insert_drives = f"INSERT INTO drives VALUES ({', '.join('?' * (len(DRIVE_COLUMNS) + 2))})"
+    for (game_id,) in conn.execute("SELECT game_id FROM games").fetchall():
+        df = pd.read_sql_query("SELECT * FROM plays WHERE game_id = ? ORDER BY drive, play_no", conn, params=(game_id,))
+        conn.executemany(insert_drives, drive_rows(game_id, df))
+
+
+def add_field_goal_made(conn):
+    """
+    Version 2: adds plays.field_goal_made, fills it from the play text and
+    recomputes every game's drives, whose results depend on it.
+    """
+    conn.execute("ALTER TABLE plays ADD COLUMN field_goal_made INTEGER")
+    plays = pd.read_sql_query("SELECT rowid, playtype, two FROM plays", conn)
+    made = field_goal_made(plays['playtype'], plays['two'])
+    conn.executemany("UPDATE plays SET field_goal_made = ? WHERE rowid = ?",
+                     zip(made.astype(int).tolist(), plays['rowid'].tolist()))
+    recompute_drives(conn)
+
+
+# Steps that bring a warehouse from the version before up to the key
+MIGRATIONS = {
+    2: add_field_goal_made,
+    # Drive positions and red zone trips come from the spot in the play text
+    3: recompute_drives,
+    # Safeties count against the drive's offense
+    4: recompute_drives,
+}
+
+
+def connect(path=WAREHOUSE_PATH):
+    """
+    Opens the warehouse, creating its tables and indexes if needed and
+    migrating a warehouse written by older code to SCHEMA_VERSION.
+
+    Args:
+    path: str. The SQLite database file.
+
+    Returns:
+    sqlite3.Connection.
+    """
+    conn = sqlite3.connect(path)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version == 0 and conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'plays'").fetchone():
+        # Created before the schema was versioned
+        version = 1
+    if version:
+        with conn:
+            for step in range(version + 1, SCHEMA_VERSION + 1):
+                MIGRATIONS[step](conn)
+    conn.executescript(SCHEMA)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return conn
+
+
+def play_rows(game_id, df):
+    """
+    Converts one game's preprocessed plays into rows for the plays table.
+    """
+    rows = pd.DataFrame({
+        'game_id': game_id,
+        'drive': df['drive'].to_numpy(),
+        'play_no': range(len(df)),
+    })
+    for column in PLAY_COLUMNS[3:]:
+        if column == 'to_go_num':
+            rows[column] = pd.to_numeric(df['to_go'].astype(object), errors='coerce').to_numpy()
+        elif column in df.columns:
+            rows[column] = df[column].to_numpy()
+        else:
+            rows[column] = None
+    # Python objects with None for missing values, which sqlite3 can bind
+    rows = rows.astype(object).where(rows.notna(), None)
+    return rows[PLAY_COLUMNS].itertuples(index=False, name=None)
+
+
+def drive_rows(game_id, df):
+    """
+    Summarises one game's preprocessed plays into rows for the drives table.
+    """
+    drives = compute_drives(df.drop(columns='game_id', errors='ignore')).reset_index()
+    drives.insert(0, 'game_id', game_id)
+    drives = drives.astype(object).where(drives.notna(), None)
+    return list(drives[['game_id', 'drive'] + DRIVE_COLUMNS].itertuples(index=False, name=None))
+
+
+def insert_game(conn, game_id, df, season=None, batch_size=INSERT_BATCH_SIZE):
+    """
+    Stores one game's plays and drive summaries, replacing any earlier copy
+    of the game. Only this game's drives are recomputed.
+
+    Args:
+    conn: sqlite3.Connection. The warehouse.
+    game_id: str. The game id.
+    df: DataFrame. The preprocessed plays of the game.
+    season: str. The season the game belongs to.
+    batch_size: int. The number of rows inserted per batch.
+
+    Returns:
+    None.
+    """
+    insert = f"INSERT INTO plays ({', '.join(PLAY_COLUMNS)}) VALUES ({', '.join('?' * len(PLAY_COLUMNS))})"
+    rows = play_rows(game_id, df)
+    drives = drive_rows(game_id, df)
+    insert_drives = f"INSERT INTO drives VALUES ({', '.join('?' * (len(DRIVE_COLUMNS) + 2))})"
+    with conn:
+        conn.execute("DELETE FROM plays WHERE game_id = ?", (game_id,))
+        conn.execute("DELETE FROM drives WHERE game_id = ?", (game_id,))
+        conn.execute("INSERT OR REPLACE INTO games (game_id, season) VALUES (?, ?)", (game_id, season))
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            conn.executemany(insert, batch)
+        conn.executemany(insert_drives, drives)
+
+
+def insert_season(conn, season_df, season=None, batch_size=INSERT_BATCH_SIZE):
+    """
+    Stores every game of a season dataset from ingestion.
+
+    Args:
+    conn: sqlite3.Connection. The warehouse.
+    season_df: DataFrame. Preprocessed plays with a 'game_id' column.
+    season: str. The season the games belong to.
+    batch_size: int. The number of rows inserted per batch.
+
+    Returns:
+    None.
+    """
+    for game_id, df in season_df.groupby('game_id', sort=False, observed=True):
+        insert_game(conn, str(game_id), df, season, batch_size)
+
+
+def games_filter(seasons=None, game_ids=None):
+    """
+    Returns an SQL condition restricting plays to some seasons or games,
+    and its parameters.
+    """
+    clause = ''
+    params = {}
+    if seasons is not None:
+        names = [f':season{i}' for i in range(len(seasons))]
+        clause += f" AND game_id IN (SELECT game_id FROM games WHERE season IN ({', '.join(names)}))"
+        params.update({name[1:]: season for name, season in zip(names, seasons)})
+    if game_ids is not None:
+        names = [f':game{i}' for i in range(len(game_ids))]
+        clause += f" AND game_id IN ({', '.join(names)})"
+        params.update({name[1:]: game_id for name, game_id in zip(names, game_ids)})
+    return clause, params
+
+
+def query_plays(conn, team=None, down=None, playtype=None, max_yardline=None, seasons=None, game_ids=None):
+    """
+    Returns the plays matching the given conditions.
+
+    Args:
+    conn: sqlite3.Connection. The warehouse.
+    team: str. The team in possession, matched case-insensitively.
+    down: str. The down, e.g. '3rd'.
+    playtype: str. The play type, matched case-insensitively.
+    max_yardline: int. Only plays at or inside this yardline.
+    seasons: list of str. Only games from these seasons.
+    game_ids: list of str. Only these games.
+
+    Returns:
+    DataFrame, ordered by game, drive and play.
+    """
+    clause, params = games_filter(seasons, game_ids)
+    conditions = {'poss': team, 'down': down, 'playtype': playtype}
+    for column, value in conditions.items():
+        if value is not None:
+            clause += f" AND {column} = :{column}"
+            params[column] = value
+    if max_yardline is not None:
+        clause += " AND yardline <= :max_yardline"
+        params['max_yardline'] = max_yardline
+    sql = f"SELECT * FROM plays WHERE 1 = 1 {clause} ORDER BY game_id, drive, play_no"
+    return pd.read_sql_query(sql, conn, params=params)
+
+
+def query_drives(conn, team=None, result=None, seasons=None, game_ids=None):
+    """
+    Returns the drive summaries matching the given conditions.
+
+    Args:
+    conn: sqlite3.Connection. The warehouse.
+    team: str. The team in possession, matched case-insensitively.
+    result: str. The drive result, e.g. 'Touchdown'.
+    seasons: list of str. Only games from these seasons.
+    game_ids: list of str. Only these games.
+
+    Returns:
+    DataFrame, ordered by game and drive.
+    """
+    clause, params = games_filter(seasons, game_ids)
+    conditions = {'team': team, 'result': result}
+    for column, value in conditions.items():
+        if value is not None:
+            clause += f" AND {column} = :{column}"
+            params[column] = value
+    sql = f"SELECT * FROM drives WHERE 1 = 1 {clause} ORDER BY game_id, drive"
+    return pd.read_sql_query(sql, conn, params=params)
+
+
+def compute_stats_table_sql(conn, explosive_play_yards=15, seasons=None, game_ids=None):
+    """
+    Computes the table returned by compute_stats_table with SQL aggregates,
+    without loading the plays into pandas.
+
+    The result can be passed as 'stats' to compute_team_stats,
+    compute_down_stats and compute_explosive_play_stats.
+
+    Args:
+    conn: sqlite3.Connection. The warehouse.
+    explosive_play_yards: int. The minimum yards for an explosive play.
+    seasons: list of str. Only games from these seasons.
+    game_ids: list of str. Only these games.
+
+    Returns:
+    DataFrame.
+    """
+    clause, params = games_filter(seasons, game_ids)
+
+    by_down = pd.read_sql_query(STATS_BY_DOWN_SQL.format(games=clause), conn,
+                                params={**params, 'explosive': explosive_play_yards})
+    by_down[COUNT_METRICS] = by_down[COUNT_METRICS].fillna(0)
+    by_down[YARD_METRICS] = by_down[YARD_METRICS].astype(float)
+    by_down = by_down.set_index(['team', 'down'])
+
+    drives = pd.read_sql_query(DRIVES_SQL.format(games=clause), conn, params=params).set_index('team')
+    team_names = pd.read_sql_query(TEAM_NAMES_SQL.format(games=clause), conn, params=params).set_index('team')['team_name']
+
+    return assemble_stats_table(by_down, drives, team_names)
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+# Play types kept apart in the histogram; everything else is 'other'
+PLAYTYPES = ['pass', 'rush', 'other']
+
+# Explosive-play totals per team, as in the 'All' rows of compute_stats_table
+EXPLOSIVE_COLUMNS = ['team_name', 'explosive_plays', 'explosive_passes', 'explosive_rushes',
+                     'explosive_tds', 'explosive_yards', 'yards']
+
+
+class YardHistogram:
+    """
+    Cumulative yardage distributions, built once per dataset.
+
+    Plays are counted per (team, play type, touchdown or not, yards), then
+    summed from the longest gain down, so entry [..., k] holds the plays
+    and yards of plays gaining at least min_yards + k. The explosive-play
+    totals for any threshold are then one column of these arrays, whatever
+    the size of the dataset.
+
+    Teams are matched case-insensitively, as in compute_stats_table.
+    """
+
+    def __init__(self, data):
+        team = data['poss'].astype(object).str.lower()
+        self.team_names = data['poss'].astype(object).groupby(team, sort=False).first()
+        self.teams = self.team_names.index
+
+        yards = data['yards'].to_numpy(dtype=float, na_value=np.nan)
+        team_codes = self.teams.get_indexer(team)
+        valid = (team_codes >= 0) & ~np.isnan(yards)
+        yards = yards[valid].astype(np.int64)
+
+        playtype = data['playtype'].astype(object).str.lower().to_numpy()[valid]
+        playtype_codes = np.full(len(yards), PLAYTYPES.index('other'))
+        playtype_codes[playtype == 'pass'] = PLAYTYPES.index('pass')
+        playtype_codes[playtype == 'rush'] = PLAYTYPES.index('rush')
+        touchdown = (data['outcome'].astype(object).str.lower() == 'touchdown').to_numpy()[valid]
+
+        self.min_yards = int(yards.min()) if len(yards) else 0
+        width = int(yards.max()) - self.min_yards + 1 if len(yards) else 1
+        shape = (len(self.teams), len(PLAYTYPES), 2, width)
+        bins = np.ravel_multi_index((team_codes[valid], playtype_codes, touchdown.astype(np.int64),
+                                     yards - self.min_yards), shape)
+        size = int(np.prod(shape))
+        plays = np.bincount(bins, minlength=size).reshape(shape)
+        yard_sums = np.bincount(bins, weights=yards, minlength=size).reshape(shape)
+
+        # Cumulative from the top, plus a trailing zero column for thresholds
+        # above the longest gain
+        zeros = np.zeros(shape[:-1] + (1,))
+        self.plays_at_least = np.concatenate([plays[..., ::-1].cumsum(axis=-1)[..., ::-1], zeros], axis=-1)
+        self.yards_at_least = np.concatenate([yard_sums[..., ::-1].cumsum(axis=-1)[..., ::-1], zeros], axis=-1)
+
+    def columns_for(self, thresholds):
+        """
+        Returns the histogram column holding the plays of at least each
+        threshold.
+        """
+        columns = np.ceil(np.asarray(thresholds, dtype=float)).astype(np.int64) - self.min_yards
+        return np.clip(columns, 0, self.plays_at_least.shape[-1] - 1)
+
+    def explosive_totals(self, explosive_play_yards):
+        """
+        Returns each team's explosive-play totals for one threshold.
+
+        Args:
+        explosive_play_yards: int. The minimum yards for an explosive play.
+
+        Returns:
+        DataFrame indexed by lowercased team with EXPLOSIVE_COLUMNS.
+        """
+        return self.sweep([explosive_play_yards]).xs(explosive_play_yards, level='threshold')
+
+    def sweep(self, thresholds):
+        """
+        Returns every team's explosive-play totals for several thresholds.
+
+        Args:
+        thresholds: list of int. The minimum yards for an explosive play.
+
+        Returns:
+        DataFrame indexed by (threshold, team) with EXPLOSIVE_COLUMNS.
+        """
+        thresholds = list(thresholds)
+        columns = self.columns_for(thresholds)
+        # Arrays of (team, playtype, touchdown, threshold)
+        plays = self.plays_at_least[..., columns]
+        yards = self.yards_at_least[..., columns]
+        pass_, rush = PLAYTYPES.index('pass'), PLAYTYPES.index('rush')
+
+        totals = {
+            'explosive_plays': plays.sum(axis=(1, 2)),
+            'explosive_passes': plays[:, pass_].sum(axis=1),
+            'explosive_rushes': plays[:, rush].sum(axis=1),
+            'explosive_tds': plays[:, :, 1].sum(axis=1),
+            'explosive_yards': yards.sum(axis=(1, 2)),
+        }
+        # Teams by threshold; flatten threshold-major
+        table = pd.DataFrame({name: values.T.ravel() for name, values in totals.items()},
+                             index=pd.MultiIndex.from_product([thresholds, self.teams], names=['threshold', 'team']))
+        for name in ['explosive_plays', 'explosive_passes', 'explosive_rushes', 'explosive_tds']:
+            table[name] = table[name].astype(int)
+        table['yards'] = np.tile(self.yards_at_least[..., 0].sum(axis=(1, 2)), len(thresholds))
+        table['team_name'] = np.tile(self.team_names.to_numpy(), len(thresholds))
+        return table[EXPLOSIVE_COLUMNS]
@@ -0,0 +1,16 @@
+import io
+import pandas as pd
+from modules.charts import aggregate_plays
+from modules.data_preprocessing import preprocess_frame
+from tests.test_drives import GAME
+
+
+def test_zones_follow_the_spot():
+    plays = preprocess_frame(pd.read_csv(io.StringIO(GAME)))
+    aggregates = aggregate_plays(plays)
+
+    # Madonna's 50 yard rush from its own 25, and its field goal try from
+    # Ave Maria's 25
+    madonna = aggregates[aggregates['poss'].astype(object).str.lower() == 'madonna'].set_index('playtype')
+    assert madonna.loc['Rush', 'zone'] == '20-30'
+    assert madonna.loc['Field Goal', 'zone'] == '70-80'
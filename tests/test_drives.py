@@ -0,0 +1,44 @@
+import io
+import pandas as pd
+from modules.data_preprocessing import preprocess_frame, preprocess_data
+from modules.drives import compute_drives
+from modules.play_schema import load_plays
+
+# A touchdown drive followed by the scoring team's kickoff, then a missed
+# field goal
+GAME = """one,two
+Ave Maria at 15:00,
+1st and 10 at AVEMARIA25,Kristian Marks rush for 45 yards to the MADONNA30.
+1st and 10 at MADONNA30,Kristian Marks pass complete to Brock Summers for 15 yards to the MADONNA15.
+1st and 10 at MADONNA15,"Q. Mauricette rush for 15 yards to the MADONNA0, TOUCHDOWN, clock 14:02."
+1st and GOAL at MADONNA03,Evan West kick attempt good.
+1st and GOAL at AVEMARIA35,"Kieran O'Neil kickoff 65 yards to the MADONNA0, touchback."
+Madonna at 14:00,
+1st and 10 at MADONNA25,A. Brantley IV rush for 50 yards to the AVEMARIA25.
+4th and 10 at AVEMARIA25,"W. Stoyanovich field goal attempt from 42 MISSED, clock 12:10."
+"""
+
+
+def test_touchdown_and_missed_field_goal():
+    drives = compute_drives(preprocess_frame(pd.read_csv(io.StringIO(GAME))))
+
+    assert list(drives['result']) == ['Touchdown', 'Missed Field Goal']
+    assert list(drives['points']) == [7, 0]
+    # The kick attempt and kickoff are not part of the drive's play count or end spot
+    assert list(drives['plays']) == [3, 2]
+    assert list(drives['yards']) == [75, 50]
+    assert list(drives['start_position']) == [25, 25]
+    assert list(drives['end_position']) == [85, 75]
+    assert list(drives['red_zone']) == [True, False]
+
+def test_preprocessed_file_without_flag(tmp_path):
+    raw = tmp_path / 'raw.csv'
+    raw.write_text(GAME)
+    preprocessed = tmp_path / 'preprocessed.csv'
+    preprocess_data(raw, preprocessed)
+    assert 'field_goal_made' not in pd.read_csv(preprocessed).columns
+
+    expected = compute_drives(preprocess_frame(pd.read_csv(raw)))
+    # load_plays derives the flag, and compute_drives does from the text
+    for plays in [load_plays(preprocessed), pd.read_csv(preprocessed)]:
+        pd.testing.assert_frame_equal(compute_drives(plays), expected, check_index_type=False)
@@ -0,0 +1,18 @@
+import io
+import numpy as np
+import pandas as pd
+from modules.data_preprocessing import preprocess_frame
+from modules.expected_points import drive_points, fit_expected_points, score_plays
+from tests.test_drives import GAME
+
+
+def test_scoring_plays_use_drive_points():
+    plays = preprocess_frame(pd.read_csv(io.StringIO(GAME)))
+    scored = score_plays(plays, fit_expected_points(plays))
+
+    # The touchdown is worth the 7 points its drive is fitted with
+    touchdown = plays['outcome'].astype(object).str.lower() == 'touchdown'
+    assert touchdown.sum() == 1
+    after = (scored['ep'] + scored['epa'])[touchdown]
+    np.testing.assert_allclose(after, drive_points(plays)[touchdown])
+    np.testing.assert_allclose(after, 7)
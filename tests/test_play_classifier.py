@@ -0,0 +1,78 @@
+import re
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+from modules import synthetic
+from modules.play_classifier import play_classifier
+
+# The per-row keyword lists preprocess_data searched before the classifier
+PLAYTYPE_WORDS = [('Pass', 'Pass'), ('Rush', 'Rush'), ('Sacked', 'Pass'), ('Sack', 'Pass'),
+                  ('Field Goal', 'Field Goal'), ('Punt', 'Punt'), ('Kick Attempt', 'Kick Attempt'),
+                  ('Penalty', 'Penalty'), ('Kickoff', 'Kickoff')]
+OUTCOME_WORDS = [('Touchdown', 'Touchdown'), ('Penalty', 'Penalty'), ('Interception', 'Interception'),
+                 ('Intercepted', 'Interception'), ('Fumble', 'Fumble'), ('Fumbled', 'Fumble'),
+                 ('1st Down', '1st Down'), ('Kick Attempt Good', 'Kick Attempt Good'),
+                 ('Kick Attempt Failed', 'Kick Attempt Failed'), ('Touchback', 'Touchback'),
+                 ('Sack', 'Sack'), ('Sacked', 'Sack'), ('Blocked', 'Blocked'), ('No Play', 'No Play'),
+                 ('Incomplete', 'Incomplete')]
+
+EDGE_TEXTS = [
+    None,
+    '',
+    'Kick attempt good.',
+    'Evan West kick attempt failed, blocked.',
+    'Kristian Marks sacked for loss of 7 yards, fumbled, recovered by MADONNA, 1st down.',
+    'PENALTY AVEMARIA false start 5 yards, NO PLAY.',
+    'Pass intercepted by Julius Adams, touchback.',
+    'Punt 40 yards, fair catch.',
+    'Timeout Madonna, clock 03:12.',
+]
+
+
+def first_match(text, words):
+    for word, label in words:
+        if re.search(word, text, re.IGNORECASE):
+            return label
+    return np.nan
+
+
+def last_match(text, words):
+    label = np.nan
+    for word, candidate in words:
+        if re.search(word, text, re.IGNORECASE):
+            label = candidate
+    return label
+
+
+def texts():
+    sample = pd.read_csv(Path(__file__).parent.parent / 'data' / 'avemaria.csv', encoding='utf-8-sig')['two'].tolist()
+    generated = [two for _, two in synthetic.generate_rows(2000, seed=7)]
+    return pd.Series(sample + generated + EDGE_TEXTS, dtype=object)
+
+
+@pytest.mark.parametrize('text, playtype, outcome, special', [
+    ('TWO-POINT pass incomplete to Brock Summers.', 'Pass', 'Incomplete', 'Two-Point Attempt'),
+    ('W. Stoyanovich onside kickoff 12 yards, fumble by Roman Newkirk.', 'Kickoff', 'Fumble', 'Onside Kick'),
+    ('Nik Allgood rush for loss of 2 yards to the MADONNA0, SAFETY.', 'Rush', None, 'Safety'),
+    ('Nik Allgood rush for 2 yards to the MADONNA27.', 'Rush', None, None),
+])
+def test_special_situations_keep_outcome(text, playtype, outcome, special):
+    labels = play_classifier.classify(pd.Series([text])).iloc[0]
+
+    assert labels['playtype'] == playtype
+    assert labels['outcome'] == outcome or (outcome is None and pd.isna(labels['outcome']))
+    assert labels['special'] == special or (special is None and pd.isna(labels['special']))
+
+
+@pytest.mark.parametrize('column, words, pick', [
+    ('playtype', PLAYTYPE_WORDS, first_match),
+    ('outcome', OUTCOME_WORDS, last_match),
+])
+def test_matches_per_row_search(column, words, pick):
+    text = texts()
+    expected = text.map(lambda two: pick(two, words) if isinstance(two, str) else np.nan)
+
+    actual = play_classifier.classify(text)[column]
+
+    pd.testing.assert_series_equal(actual, expected, check_names=False)
@@ -0,0 +1,49 @@
+import io
+import numpy as np
+import pandas as pd
+import pytest
+from modules.data_preprocessing import OUTPUT_COLUMNS, preprocess_frame, preprocess_data
+
+# A game file that starts mid-drive, before any "X at MM:SS" possession line
+NO_POSSESSION = """one,two
+1st and 10 at MADONNA35,"W. Stoyanovich kickoff 54 yards to the AVEMARIA11, Roman Newkirk return 38 yards to the AVEMARIA49."
+1st and 10 at AVEMARIA49,Kristian Marks pass complete to Joshua Jenkins for loss of 3 yards to the AVEMARIA46.
+2nd and 13 at AVEMARIA46,Q. Mauricette rush for 7 yards to the MADONNA47.
+"""
+
+# Markers, possession changes and a touchdown, to be split at every row
+GAME = """one,two
+Start of 1st Half,
+1st and 10 at MADONNA35,"W. Stoyanovich kickoff 54 yards to the AVEMARIA11, Roman Newkirk return 38 yards to the AVEMARIA49."
+Ave Maria at 14:55,
+1st and 10 at AVEMARIA49,Kristian Marks pass complete to Joshua Jenkins for loss of 3 yards to the AVEMARIA46.
+2nd and 13 at AVEMARIA46,Q. Mauricette rush for 7 yards to the MADONNA47.
+3rd and 6 at MADONNA47,Kristian Marks pass incomplete to Brock Summers.
+4th and 6 at MADONNA47,"W. Stoyanovich punt 40 yards to the MADONNA7, fair catch."
+Madonna at 12:30,
+1st and 10 at MADONNA07,A. Brantley IV rush for 12 yards to the MADONNA19.
+Start of Quarter #2,
+1st and 10 at MADONNA19,"Nik Allgood rush for 81 yards to the AVEMARIA0, TOUCHDOWN, clock 11:02."
+"""
+
+
+def test_file_without_possession_line():
+    df = preprocess_frame(pd.read_csv(io.StringIO(NO_POSSESSION)))
+
+    assert df['poss'].isna().all()
+    assert list(df['ball_half']) == ['opponents'] * 3
+    assert list(df['drive']) == [0, 0, 0]
+    assert list(df['yardline']) == [35, 49, 46]
+    np.testing.assert_array_equal(df['yards'], [np.nan, -3, 7])
+
+
+@pytest.mark.parametrize('text', [NO_POSSESSION, GAME], ids=['no_possession', 'game'])
+def test_chunk_boundaries(tmp_path, text):
+    raw = tmp_path / 'raw.csv'
+    raw.write_text(text)
+    expected = preprocess_frame(pd.read_csv(raw))[OUTPUT_COLUMNS].to_csv(index=False)
+
+    for chunksize in range(1, len(text.splitlines()) + 1):
+        output = tmp_path / f'out{chunksize}.csv'
+        preprocess_data(raw, output, chunksize=chunksize)
+        assert output.read_text() == expected, f'chunksize={chunksize}'
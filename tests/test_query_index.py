@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+from modules import synthetic
+from modules.data_preprocessing import preprocess_frame
+from modules.query_index import PlayIndex
+
+
+def season():
+    games = [pd.DataFrame(synthetic.generate_rows(400, seed=seed), columns=['one', 'two']) for seed in range(3)]
+    data = pd.concat([preprocess_frame(rows) for rows in games], ignore_index=True)
+    # As if the file started before the first possession line
+    data.loc[:20, 'poss'] = np.nan
+    return data
+
+
+def masked(data, selected_teams, selected_downs, selected_playtypes, selected_yards_range):
+    # filter_data before the index
+    return data[
+        (data['poss'].isin(selected_teams)) &
+        (data['down'] == selected_downs) &
+        (data['yards'] >= selected_yards_range[0]) & (data['yards'] <= selected_yards_range[1]) &
+        (data['playtype'].isin(selected_playtypes))
+    ]
+
+
+@pytest.mark.parametrize('teams, down, playtypes, yards_range', [
+    (['Madonna', 'Ave Maria'], '1st', ['Rush', 'Pass'], (-10, 30)),
+    (['Madonna'], '3rd', ['Pass'], (0, 0)),
+    (['Madonna', np.nan], '2nd', ['Rush', 'Pass', 'Punt'], (-99, 99)),
+    (['Madonna', 'Ave Maria'], '4th', ['Rush', 'Pass', 'Punt', 'Field Goal'], (-99, 99)),
+    (['Nobody'], '1st', ['Rush'], (-99, 99)),
+    (['Madonna', 'Ave Maria'], np.nan, ['Rush', 'Pass'], (-99, 99)),
+    (['Madonna', 'Ave Maria'], '1st', ['Rush', 'Pass'], (50, 10)),
+])
+@pytest.mark.parametrize('categorical', [False, True])
+def test_query_matches_masks(teams, down, playtypes, yards_range, categorical):
+    data = season()
+    if categorical:
+        data[['poss', 'down', 'playtype']] = data[['poss', 'down', 'playtype']].astype('category')
+
+    expected = masked(data, teams, down, playtypes, yards_range)
+    actual = PlayIndex(data).query(teams, down, playtypes, yards_range)
+
+    pd.testing.assert_frame_equal(actual, expected)
@@ -0,0 +1,70 @@
+import sqlite3
+import pandas as pd
+import pytest
+from modules import synthetic, warehouse
+from modules.data_preprocessing import preprocess_frame
+from modules.data_processing import compute_stats_table
+
+# The plays table as the first warehouses created it, before field_goal_made
+UNVERSIONED_SCHEMA = '''
+CREATE TABLE games (game_id TEXT PRIMARY KEY, season TEXT);
+CREATE TABLE plays (
+    game_id TEXT NOT NULL REFERENCES games (game_id),
+    drive INTEGER NOT NULL,
+    play_no INTEGER NOT NULL,
+    half INTEGER,
+    quarter INTEGER,
+    poss TEXT COLLATE NOCASE,
+    down TEXT,
+    to_go TEXT,
+    to_go_num REAL,
+    playtype TEXT COLLATE NOCASE,
+    yards INTEGER,
+    outcome TEXT COLLATE NOCASE,
+    ball_half TEXT COLLATE NOCASE,
+    yardline INTEGER,
+    one TEXT,
+    two TEXT,
+    PRIMARY KEY (game_id, drive, play_no)
+);
+'''
+
+
+def game(seed):
+    rows = pd.DataFrame(synthetic.generate_rows(400, seed=seed), columns=['one', 'two'])
+    return preprocess_frame(rows)
+
+
+def test_unversioned_warehouse_is_migrated(tmp_path):
+    plays = game(1)
+    old_path = tmp_path / 'old.sqlite'
+    conn = sqlite3.connect(old_path)
+    conn.executescript(UNVERSIONED_SCHEMA)
+    columns = warehouse.PLAY_COLUMNS[:-1]
+    conn.execute("INSERT INTO games VALUES ('g1', NULL)")
+    conn.executemany(f"INSERT INTO plays VALUES ({', '.join('?' * len(columns))})",
+                     [row[:-1] for row in warehouse.play_rows('g1', plays)])
+    conn.commit()
+    conn.close()
+
+    new = warehouse.connect(tmp_path / 'new.sqlite')
+    warehouse.insert_game(new, 'g1', plays)
+    migrated = warehouse.connect(old_path)
+
+    assert migrated.execute("PRAGMA user_version").fetchone()[0] == warehouse.SCHEMA_VERSION
+    pd.testing.assert_frame_equal(warehouse.query_plays(migrated), warehouse.query_plays(new))
+    pd.testing.assert_frame_equal(warehouse.query_drives(migrated), warehouse.query_drives(new))
+
+
+@pytest.mark.parametrize('seeds, explosive_play_yards', [([1], 15), ([2, 3], 10), ([4, 5, 6], 25)])
+def test_sql_stats_match_compute_stats_table(tmp_path, seeds, explosive_play_yards):
+    conn = warehouse.connect(tmp_path / 'warehouse.sqlite')
+    games = {f'g{seed}': game(seed) for seed in seeds}
+    for game_id, plays in games.items():
+        warehouse.insert_game(conn, game_id, plays)
+    season = pd.concat([plays.assign(game_id=game_id) for game_id, plays in games.items()], ignore_index=True)
+
+    expected = compute_stats_table(season, explosive_play_yards)
+    actual = warehouse.compute_stats_table_sql(conn, explosive_play_yards)
+
+    pd.testing.assert_frame_equal(actual.sort_index(), expected.sort_index(), check_dtype=False)
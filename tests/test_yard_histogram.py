@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+from modules import synthetic
+from modules.data_preprocessing import preprocess_frame
+from modules.data_processing import compute_stats_table
+from modules.yard_histogram import EXPLOSIVE_COLUMNS, YardHistogram
+
+
+def season():
+    games = [pd.DataFrame(synthetic.generate_rows(400, seed=seed), columns=['one', 'two']) for seed in range(3)]
+    return pd.concat([preprocess_frame(rows) for rows in games], ignore_index=True)
+
+
+@pytest.mark.parametrize('explosive_play_yards', [-100, 0, 10, 12.5, 15, 40, 1000])
+def test_totals_match_stats_table(explosive_play_yards):
+    data = season()
+
+    expected = compute_stats_table(data, explosive_play_yards).xs('All', level='down')[EXPLOSIVE_COLUMNS]
+    actual = YardHistogram(data).explosive_totals(explosive_play_yards)
+
+    pd.testing.assert_frame_equal(actual.sort_index(), expected.sort_index(), check_dtype=False, check_names=False)
+
+
+def test_sweep_matches_single_thresholds():
+    histogram = YardHistogram(season())
+    thresholds = [5, 15, 25]
+
+    sweep = histogram.sweep(thresholds)
+    for threshold in thresholds:
+        pd.testing.assert_frame_equal(sweep.xs(threshold, level='threshold'), histogram.explosive_totals(threshold))